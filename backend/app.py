@@ -1,11 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, url_for, g
 from flask_cors import CORS
+from datetime import datetime
 import json
+import time
 
 from .models.traffic_flow import TrafficFlow as TrafficFlowModel
 from .models.junction_config import JunctionConfiguration as JunctionConfigModel
 from .models.traffic_flow_input import TrafficFlowInput
 from .models.junction_config_input import JunctionConfigurationInput
+from .models.simulation_options_input import SimulationOptionsInput
+from .models.list_query_input import ListQueryInput
+from .optimizer import optimise_junction
+from .simulation import JunctionSimulation, default_duration
+from .simulation_service import run_cached_simulation, run_cached_simulations, MAX_BATCH_SIMULATIONS
+from .jobs import job_queue
+from .time_series import decoding_series
+from .bulk_transfer import exporting_configurations, importing_configurations, IMPORT_BATCH_SIZE
+from .db_session import ending_request_session
+from .metrics import metrics
+from .profiling import RequestProfile, profiling_requested
 
 from .storage import (
     getting_traffic_flow,
@@ -15,9 +28,18 @@ from .storage import (
     getting_junction_configuration,
     deleting_junction_configuration,
     saving_junction_configuration,
-    get_all_traffic_flows,
-    get_functions_for_traffic_flow,
-    migrate_json_to_db
+    updating_junction_configuration,
+    getting_traffic_flow_summaries,
+    getting_junction_summaries,
+    getting_traffic_flow_name_taken,
+    getting_traffic_flow_count,
+    getting_junction_name_taken,
+    getting_junction_count,
+    ConfigurationNameTaken,
+    getting_simulation_job,
+    getting_simulation_runs,
+    getting_simulation_run,
+    getting_junctions_with_traffic_flows
 )
 
 # Initialize the Flask app
@@ -26,56 +48,170 @@ CORS(app, resources={
      r"/api/*": {
          "origins": ["http://localhost:3000"],
          "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization"]
+         "allow_headers": ["Content-Type", "Authorization", "X-Profile", "X-Profile-Memory"],
+         "expose_headers": ["Link", "X-Next-Cursor", "Server-Timing"]
      }
 })
 
-# Initialize database on first run
-@app.before_first_request
-def initialize_db():
-    migrate_json_to_db()
+# Summary columns the list endpoints filter and sort on
+TRAFFIC_FLOW_RANGE_FIELDS = ("northbound", "southbound", "eastbound", "westbound", "total")
+JUNCTION_RANGE_FIELDS = ("lanes", "efficiency")
+JUNCTION_FLAG_FIELDS = ("has_left_turn_lane", "has_bus_lane", "has_cycle_lane", "has_pedestrian_crossing")
+
+# Summary attributes holding each sort field's value, for the next page's cursor
+TRAFFIC_FLOW_SORT_KEYS = {
+    "id": "id",
+    "name": "name",
+    "northbound": "northbound_flow",
+    "southbound": "southbound_flow",
+    "eastbound": "eastbound_flow",
+    "westbound": "westbound_flow",
+    "total": "total_flow"
+}
+JUNCTION_SORT_KEYS = {"id": "id", "name": "name", "lanes": "total_lanes", "efficiency": "efficiency_score"}
+
+TRAFFIC_FLOW_OUTPUT_FIELDS = ("id", "name", "northVPH", "southVPH", "eastVPH", "westVPH", "junctionCount")
+JUNCTION_OUTPUT_FIELDS = (
+    "id", "name", "trafficFlow", "lanes", "totalLanes", "hasLeftTurnLanes",
+    "hasBusCycleLanes", "hasPedestrianCrossing", "efficiencyScore", "metrics"
+)
+
+def transforming_traffic_flow_summary(flow):
+    """Shapes a TrafficFlowSummary for the frontend's saved configurations list."""
+    return {
+        "id": str(flow.id),
+        "name": flow.name,
+        "northVPH": flow.northbound_flow,
+        "southVPH": flow.southbound_flow,
+        "eastVPH": flow.eastbound_flow,
+        "westVPH": flow.westbound_flow,
+        "junctionCount": flow.junction_count
+    }
+
+def transforming_junction_summary(junction):
+    """Shapes a JunctionSummary for the frontend's junction lists."""
+    return {
+        "id": str(junction.id),
+        "name": junction.name,
+        "trafficFlow": junction.traffic_flow_config,
+        "lanes": junction.total_lanes // 4,
+        "totalLanes": junction.total_lanes,
+        "hasLeftTurnLanes": junction.has_left_turn_lane,
+        "hasBusCycleLanes": junction.has_bus_lane or junction.has_cycle_lane,
+        "hasPedestrianCrossing": junction.has_pedestrian_crossing,
+        "efficiencyScore": junction.efficiency_score,
+        "metrics": junction.metrics
+    }
+
+def paginated_response(list_query, summaries, sort_keys, transform):
+    """
+    Returns one page of a list endpoint as a JSON array.
+    
+    Storage is asked for one row more than the page size; if it comes back
+    the cursor for the next page is sent in X-Next-Cursor and a Link header.
+    """
+    page = summaries[:list_query.limit]
+    response = jsonify([list_query.selecting_fields(transform(summary)) for summary in page])
+    
+    if len(summaries) > list_query.limit:
+        last = page[-1]
+        cursor = list_query.encoding_cursor(getattr(last, sort_keys[list_query.sort[0]]), last.id)
+        args = {**request.args.to_dict(), "cursor": cursor}
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = f'<{url_for(request.endpoint, **request.view_args, **args)}>; rel="next"'
+    
+    return response
+
+# Count and time every request by route; registered first so it sees the final status
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observing("http_request_duration_seconds", time.perf_counter() - started, route=route, method=request.method)
+        metrics.counting("http_requests_total", route=route, method=request.method, status=str(response.status_code))
+        if response.status_code >= 500:
+            metrics.counting("http_request_errors_total", route=route, method=request.method)
+        metrics.starting_flusher()
+    return response
+
+# Profile requests that carry the profiling token; stopped after the transaction is committed
+@app.before_request
+def start_request_profile():
+    if profiling_requested(request.headers, request.args):
+        memory = (request.headers.get("X-Profile-Memory") or request.args.get("profile_memory", "")).lower() in ("1", "true")
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        g.request_profile = RequestProfile(request.method, route, memory=memory)
+        g.request_profile.start()
+
+@app.after_request
+def save_request_profile(response):
+    profile = g.pop("request_profile", None)
+    if profile is not None:
+        try:
+            response.headers["Server-Timing"] = profile.stop()
+        except OSError as e:
+            print(f"Error saving request profile: {str(e)}")
+    return response
+
+@app.teardown_request
+def stop_request_profile(exception=None):
+    # Only reached with a profile still running if the response was never built
+    profile = g.pop("request_profile", None)
+    if profile is not None:
+        try:
+            profile.stop()
+        except OSError as e:
+            print(f"Error saving request profile: {str(e)}")
+
+# Each request's storage calls share one session and transaction
+@app.after_request
+def commit_request_transaction(response):
+    if not ending_request_session(commit=response.status_code < 400):
+        response = jsonify({"success": False, "error": "Changes could not be saved"})
+        response.status_code = 500
+    return response
+
+@app.teardown_appcontext
+def close_request_session(exception=None):
+    # Only reached with a session still open if the request raised
+    ending_request_session(commit=False)
 
 # Add test endpoint
 @app.route('/api/test', methods=['GET'])
 def test():
     return jsonify({"message": "Backend API is running"})
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request, storage, cache and simulation metrics in the Prometheus text format."""
+    return Response(metrics.rendering(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/api/traffic-flows', methods=['GET'])
 def get_traffic_flows():
-    """Gets all traffic flow configurations."""
+    """Gets all traffic flow configurations, optionally filtered and sorted by incoming flow."""
     try:
-        traffic_flows_data = get_all_traffic_flows()
+        list_query = ListQueryInput(
+            args=request.args,
+            range_fields=TRAFFIC_FLOW_RANGE_FIELDS,
+            flag_fields=(),
+            sort_fields=("id", "name") + TRAFFIC_FLOW_RANGE_FIELDS,
+            output_fields=TRAFFIC_FLOW_OUTPUT_FIELDS
+        )
         
-        # Transform the data for frontend
-        traffic_flows = []
+        if not list_query.validate():
+            return jsonify({"error": list_query.errors}), 400
         
-        for flow in traffic_flows_data:
-            flows = flow.get("flows", {})
-            
-            # Calculate total flows for each direction
-            northVPH = (flows.get("northbound", {}).get("incoming_flow", 0) or 
-                     sum(flows.get("northbound", {}).get("exits", {}).values(), 0))
-            southVPH = (flows.get("southbound", {}).get("incoming_flow", 0) or 
-                     sum(flows.get("southbound", {}).get("exits", {}).values(), 0))
-            eastVPH = (flows.get("eastbound", {}).get("incoming_flow", 0) or 
-                    sum(flows.get("eastbound", {}).get("exits", {}).values(), 0))
-            westVPH = (flows.get("westbound", {}).get("incoming_flow", 0) or 
-                    sum(flows.get("westbound", {}).get("exits", {}).values(), 0))
-            
-            # Get junctions for this traffic flow
-            junctions = get_functions_for_traffic_flow(flow.get("id") or flow.get("name", ""))
-            
-            traffic_flows.append({
-                "id": str(flow.get("id", "")),
-                "name": flow.get("name", ""),
-                "northVPH": northVPH,
-                "southVPH": southVPH,
-                "eastVPH": eastVPH,
-                "westVPH": westVPH,
-                "junctionCount": len(junctions) if junctions else 0
-            })
-            
-        return jsonify(traffic_flows)
+        # Flows and junction counts come from indexed summary columns in one grouped query
+        traffic_flows_data = getting_traffic_flow_summaries(
+            list_query.filters, list_query.sort, after=list_query.after, limit=list_query.limit + 1
+        )
+        
+        return paginated_response(list_query, traffic_flows_data, TRAFFIC_FLOW_SORT_KEYS, transforming_traffic_flow_summary)
         
     except Exception as e:
         print(f"Error in get_traffic_flows: {str(e)}")
@@ -108,26 +244,27 @@ def create_traffic_flow():
     """Creates a new traffic flow configuration."""
     try:
         new_config = request.get_json()
-        
-        # Get all traffic flows to check for name uniqueness
-        all_flows = get_all_traffic_flows()
-        existing_names = {flow.get("name") for flow in all_flows}
 
         # Extract flow rates from new format
         flow_rates = {}
         exit_distributions = {}
+        demand_profiles = {}
         
         for direction in ['northbound', 'southbound', 'eastbound', 'westbound']:
             if direction in new_config.get("flows", {}):
                 direction_data = new_config["flows"][direction]
                 flow_rates[direction] = direction_data.get("incoming_flow", 0)
                 exit_distributions[direction] = direction_data.get("exits", {})
+                if direction_data.get("profile"):
+                    demand_profiles[direction] = direction_data["profile"]
 
         # Creates and validates TrafficFlowInput
+        # Uniqueness and the cap are indexed EXISTS and COUNT queries
         traffic_flow_input = TrafficFlowInput(
             name=new_config.get("name", ""),
             flows=new_config.get("flows", {}),
-            existing_traffic_config_names=existing_names
+            name_taken=getting_traffic_flow_name_taken(new_config.get("name", "")),
+            configuration_count=getting_traffic_flow_count()
         )
 
         if not traffic_flow_input.validate():
@@ -140,13 +277,23 @@ def create_traffic_flow():
         traffic_flow = TrafficFlowModel(
             name=new_config.get("name", ""),
             flow_rates=flow_rates,
-            exit_distributions=exit_distributions
+            exit_distributions=exit_distributions,
+            demand_profiles=demand_profiles
         )
         
-        if not saving_traffic_flow(traffic_flow):
+        try:
+            saved = saving_traffic_flow(traffic_flow)
+        except ConfigurationNameTaken as e:
+            # Another request stored the name after it was checked
             return jsonify({
                 "success": False,
-                "error": "Traffic flow configuration already exists or could not be saved"
+                "error": [str(e)]
+            }), 400
+        
+        if not saved:
+            return jsonify({
+                "success": False,
+                "error": ["Traffic flow configuration already exists or could not be saved"]
             }), 400
         
         return jsonify({
@@ -176,65 +323,61 @@ def update_traffic_flow(flow_id):
         update_config = request.get_json()
         new_name = update_config.get("name", flow_id)
 
-        # Get all traffic flows to check for name uniqueness
-        all_flows = get_all_traffic_flows()
-        existing_names = {flow.get("name") for flow in all_flows if str(flow.get("id")) != str(flow_id)}
+        name_taken = getting_traffic_flow_name_taken(new_name, excluding_id=existing_flow.get("id"))
 
-        if new_name in existing_names:
+        if name_taken:
             return jsonify({
                 "success": False,
-                "error": f"Traffic flow configuration '{new_name}' already exists."
+                "error": [f"Traffic flow configuration '{new_name}' already exists."]
             }), 400
         
         # Extract flow rates and exit distributions from new format
         flow_rates = {}
         exit_distributions = {}
+        demand_profiles = {}
         
         for direction in ['northbound', 'southbound', 'eastbound', 'westbound']:
             if direction in update_config.get("flows", {}):
                 direction_data = update_config["flows"][direction]
                 flow_rates[direction] = direction_data.get("incoming_flow", 0)
                 exit_distributions[direction] = direction_data.get("exits", {})
+                if direction_data.get("profile"):
+                    demand_profiles[direction] = direction_data["profile"]
         
+        # An update doesn't add a configuration, so the cap doesn't apply
         traffic_flow_input = TrafficFlowInput(
             name=new_name,
             flows=update_config.get("flows", {}),
-            existing_traffic_config_names=existing_names
+            name_taken=name_taken
         )
 
         if not traffic_flow_input.validate():
             return jsonify({
                 "success": False,
-                "errors": traffic_flow_input.errors
+                "error": traffic_flow_input.errors
             }), 400
 
         traffic_flow = TrafficFlowModel(
             name=new_name,
             flow_rates=flow_rates,
-            exit_distributions=exit_distributions
+            exit_distributions=exit_distributions,
+            demand_profiles=demand_profiles
         )
 
-        if new_name != existing_flow.get("name"):
-            # Need to handle name change by delete and recreate
-            if not deleting_traffic_flow(flow_id):
-                return jsonify({
-                    "success": False,
-                    "error": "Failed to delete the old traffic flow configuration"
-                }), 500
-                
-            # Then save the new one
-            if not saving_traffic_flow(traffic_flow):
-                return jsonify({
-                    "success": False,
-                    "error": "Failed to save the updated traffic flow configuration"
-                }), 500
-        else:
-            # If the name hasn't changed, use the updating function instead
-            if not updating_traffic_flow(traffic_flow):
-                return jsonify({
-                    "success": False,
-                    "error": "Failed to update the traffic flow configuration"
-                }), 500
+        # Renames happen in place, keeping the flow's ID and its junctions
+        try:
+            updated = updating_traffic_flow(traffic_flow, flow_id=existing_flow.get("id"))
+        except ConfigurationNameTaken as e:
+            return jsonify({
+                "success": False,
+                "error": [str(e)]
+            }), 400
+        
+        if not updated:
+            return jsonify({
+                "success": False,
+                "error": ["Failed to update the traffic flow configuration"]
+            }), 500
         
         return jsonify({
             "success": True,
@@ -279,42 +422,333 @@ def simulate_junction(junction_id):
         if not junction:
             return jsonify({"error": "Junction configuration not found"}), 404
         
-        # In a real implementation, we would run the simulation
-        # For now, we'll return mock simulation results
+        traffic_flow = getting_traffic_flow(junction.get("traffic_flow_config"))
         
-        # Mock simulation results
-        simulation_results = {
-            "average_wait_times": {
-                "northbound": 15.2,
-                "southbound": 18.5,
-                "eastbound": 12.8,
-                "westbound": 14.3
-            },
-            "max_wait_times": {
-                "northbound": 38,
-                "southbound": 45,
-                "eastbound": 32,
-                "westbound": 36
-            },
-            "max_queue_lengths": {
-                "northbound": 8,
-                "southbound": 12,
-                "eastbound": 6,
-                "westbound": 7
-            },
-            "efficiency_score": 0.75,
-            "sustainability_score": 0.68
+        if not traffic_flow:
+            return jsonify({"error": "Traffic flow configuration not found"}), 404
+        
+        replications = request.args.get("replications", 1, type=int)
+        options_input = SimulationOptionsInput(
+            kind="replications" if replications > 1 else "simulate",
+            options={
+                "duration": request.args.get("duration", default_duration(traffic_flow.get("flows", {})), type=int),
+                "seed": request.args.get("seed", None, type=int),
+                "replications": replications,
+                "mode": request.args.get("mode", "simulation")
+            }
+        )
+        
+        if not options_input.validate():
+            return jsonify({"error": options_input.errors}), 400
+        
+        simulation_results = run_cached_simulation(junction, traffic_flow, **options_input.cleaned_options())
+        
+        response = {
+            "success": True,
+            "junction_id": junction_id,
+            "junction_name": junction.get("name", ""),
+            "results": simulation_results
         }
+        if replications > 1:
+            response["replications"] = replications
+        if options_input.options["mode"] == "analytic":
+            response["mode"] = "analytic"
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        print(f"Error in simulate_junction: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/junctions/<junction_id>/simulate/stream', methods=['GET'])
+def stream_junction_simulation(junction_id):
+    """Streams per-interval queue and wait statistics as NDJSON or Server-Sent Events."""
+    try:
+        junction = getting_junction_configuration(junction_id)
+        
+        if not junction:
+            return jsonify({"error": "Junction configuration not found"}), 404
+        
+        traffic_flow = getting_traffic_flow(junction.get("traffic_flow_config"))
+        
+        if not traffic_flow:
+            return jsonify({"error": "Traffic flow configuration not found"}), 404
+        
+        options_input = SimulationOptionsInput(
+            kind="simulate",
+            options={
+                "duration": request.args.get("duration", default_duration(traffic_flow.get("flows", {})), type=int),
+                "seed": request.args.get("seed", None, type=int)
+            }
+        )
+        interval = request.args.get("interval", 60, type=int)
+        
+        if not options_input.validate():
+            return jsonify({"error": options_input.errors}), 400
+        
+        if not 1 <= interval <= 3600:
+            return jsonify({"error": "Reporting interval must be between 1 and 3600 seconds"}), 400
+        
+        use_sse = (request.args.get("format") == "sse"
+                   or request.accept_mimetypes.best == "text/event-stream")
+        
+        options = options_input.cleaned_options()
+        simulation = JunctionSimulation(
+            junction_data=junction,
+            flow_data=traffic_flow.get("flows", {}),
+            duration=options["duration"],
+            seed=options["seed"]
+        )
+        
+        def encode(event_type, payload):
+            if use_sse:
+                return f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
+            return json.dumps({"type": event_type, **payload}) + "\n"
+        
+        def generate():
+            # Each snapshot is written out as soon as the engine reaches it
+            for snapshot in simulation.iter_intervals(interval):
+                yield encode("interval", snapshot)
+            yield encode("summary", {"results": simulation.results.to_dict()})
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream" if use_sse else "application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+        
+    except Exception as e:
+        print(f"Error in stream_junction_simulation: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/simulate/batch', methods=['POST'])
+def simulate_junctions_batch():
+    """Simulates several junction configurations at once, returning their results in the order requested."""
+    try:
+        batch_request = request.get_json(silent=True) or {}
+        junction_ids = batch_request.get("junction_ids")
+        
+        if (not isinstance(junction_ids, list) or not junction_ids
+                or not all(isinstance(junction_id, (int, str)) and not isinstance(junction_id, bool) for junction_id in junction_ids)):
+            return jsonify({"success": False, "error": "'junction_ids' must be a non-empty list of junction IDs or names"}), 400
+        
+        if len(junction_ids) > MAX_BATCH_SIMULATIONS:
+            return jsonify({"success": False, "error": f"A batch can simulate at most {MAX_BATCH_SIMULATIONS} junctions"}), 400
+        
+        options = dict(batch_request.get("options") or {})
+        replications = options.get("replications", 1)
+        options_input = SimulationOptionsInput(
+            kind="replications" if isinstance(replications, int) and replications > 1 else "simulate",
+            options=options
+        )
+        
+        if not options_input.validate():
+            return jsonify({"success": False, "error": options_input.errors}), 400
+        
+        loaded = getting_junctions_with_traffic_flows(junction_ids)
+        
+        if loaded is None:
+            return jsonify({"success": False, "error": "Junction configurations could not be loaded"}), 500
+        
+        junctions, traffic_flows = loaded
+        by_identifier = {}
+        for junction in junctions:
+            by_identifier[str(junction["id"])] = junction
+            by_identifier[junction["name"]] = junction
+        
+        missing = [junction_id for junction_id in junction_ids if str(junction_id) not in by_identifier]
+        if missing:
+            return jsonify({"success": False, "error": "Junction configurations not found", "missing": missing}), 404
+        
+        pairs = []
+        for junction_id in junction_ids:
+            junction = by_identifier[str(junction_id)]
+            traffic_flow = traffic_flows.get(junction.get("traffic_flow_config"))
+            if not traffic_flow:
+                return jsonify({"success": False, "error": f"Traffic flow configuration not found for junction {junction_id}"}), 404
+            pairs.append((junction, traffic_flow))
+        
+        cleaned = options_input.cleaned_options()
+        # Without a duration each junction covers its own traffic flow's demand profile
+        results = run_cached_simulations(
+            pairs,
+            duration=cleaned["duration"] if "duration" in options else None,
+            seed=cleaned["seed"],
+            replications=cleaned["replications"],
+            mode=cleaned["mode"]
+        )
+        
+        return jsonify({
+            "success": True,
+            "results": [
+                {"junction_id": junction["id"], "junction_name": junction["name"], "results": junction_results}
+                for (junction, _), junction_results in zip(pairs, results)
+            ]
+        })
+        
+    except Exception as e:
+        print(f"Error in simulate_junctions_batch: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/junctions/<junction_id>/optimize', methods=['POST'])
+def optimize_junction(junction_id):
+    """Searches every valid signal priority assignment for the best configurations."""
+    try:
+        junction = getting_junction_configuration(junction_id)
+        
+        if not junction:
+            return jsonify({"error": "Junction configuration not found"}), 404
+        
+        traffic_flow = getting_traffic_flow(junction.get("traffic_flow_config"))
+        
+        if not traffic_flow:
+            return jsonify({"error": "Traffic flow configuration not found"}), 404
+        
+        options_input = SimulationOptionsInput(kind="optimize", options=request.get_json(silent=True) or {})
+        
+        if not options_input.validate():
+            return jsonify({"error": options_input.errors}), 400
+        
+        try:
+            best_configurations = optimise_junction(
+                junction_data=junction,
+                flow_data=traffic_flow.get("flows", {}),
+                **options_input.cleaned_options()
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
             "success": True,
             "junction_id": junction_id,
             "junction_name": junction.get("name", ""),
-            "results": simulation_results
+            "configurations": best_configurations
         })
         
     except Exception as e:
-        print(f"Error in simulate_junction: {str(e)}")
+        print(f"Error in optimize_junction: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/simulation-jobs', methods=['POST'])
+def submit_simulation_job():
+    """Queues a simulation, replication or optimizer run and returns its job ID."""
+    try:
+        job_request = request.get_json(silent=True) or {}
+        junction_id = job_request.get("junction_id")
+        kind = job_request.get("kind", "simulate")
+        
+        junction = getting_junction_configuration(junction_id) if junction_id is not None else None
+        
+        if not junction:
+            return jsonify({"success": False, "error": "Junction configuration not found"}), 404
+        
+        options = dict(job_request.get("options") or {})
+        if "duration" not in options:
+            # Cover the whole demand profile unless told otherwise
+            traffic_flow = getting_traffic_flow(junction.get("traffic_flow_config")) or {}
+            options["duration"] = default_duration(traffic_flow.get("flows", {}))
+        
+        options_input = SimulationOptionsInput(kind=kind, options=options)
+        
+        if not options_input.validate():
+            return jsonify({"success": False, "error": options_input.errors}), 400
+        
+        job_id = job_queue.submit(junction.get("id"), kind, options_input.cleaned_options())
+        
+        if not job_id:
+            return jsonify({"success": False, "error": "Simulation job could not be queued"}), 500
+        
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status": "queued"
+        }), 202
+        
+    except Exception as e:
+        print(f"Error in submit_simulation_job: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/simulation-jobs/<job_id>', methods=['GET'])
+def get_simulation_job(job_id):
+    """Gets the status, progress and (once finished) results of a simulation job."""
+    try:
+        job = getting_simulation_job(job_id)
+        
+        if not job:
+            return jsonify({"error": "Simulation job not found"}), 404
+        
+        return jsonify(job)
+        
+    except Exception as e:
+        print(f"Error in get_simulation_job: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/simulation-jobs/<job_id>', methods=['DELETE'])
+def cancel_simulation_job(job_id):
+    """Cancels a queued or running simulation job."""
+    try:
+        if not job_queue.cancel(job_id):
+            return jsonify({
+                "success": False,
+                "error": "Simulation job not found or already finished"
+            }), 404
+        
+        return jsonify({
+            "success": True,
+            "message": "Simulation job cancellation requested"
+        })
+        
+    except Exception as e:
+        print(f"Error in cancel_simulation_job: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/junctions/<junction_id>/runs', methods=['GET'])
+def get_simulation_runs(junction_id):
+    """Lists a junction's past simulation runs, newest first, without their time series."""
+    try:
+        junction = getting_junction_configuration(junction_id)
+        
+        if not junction:
+            return jsonify({"error": "Junction configuration not found"}), 404
+        
+        limit = request.args.get("limit", 20, type=int)
+        before = request.args.get("before")
+        
+        if not 1 <= limit <= 200:
+            return jsonify({"error": "Limit must be between 1 and 200"}), 400
+        
+        if before is not None:
+            try:
+                before = datetime.fromisoformat(before)
+            except ValueError:
+                return jsonify({"error": "'before' must be an ISO 8601 timestamp"}), 400
+        
+        runs = getting_simulation_runs(
+            junction.get("id"), limit=limit, before=before, config_hash=request.args.get("config_hash")
+        )
+        return jsonify(runs)
+        
+    except Exception as e:
+        print(f"Error in get_simulation_runs: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/simulation-runs/<int:run_id>', methods=['GET'])
+def get_simulation_run(run_id):
+    """Re-opens a past simulation run, with its per-interval snapshots unless series=false."""
+    try:
+        stored = getting_simulation_run(run_id)
+        
+        if not stored:
+            return jsonify({"error": "Simulation run not found"}), 404
+        
+        run, series = stored
+        if request.args.get("series", "true").lower() not in ("false", "0"):
+            run["series"] = decoding_series(series) if series is not None else None
+        
+        return jsonify(run)
+        
+    except Exception as e:
+        print(f"Error in get_simulation_run: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/junctions/<junction_id>', methods=['GET'])
@@ -425,11 +859,36 @@ def create_junction():
             traffic_flow_name=traffic_flow_name
         )
         
+        # Uniqueness and the per-flow cap are indexed EXISTS and COUNT queries
+        junction_input = JunctionConfigurationInput(
+            name=junction_config.name,
+            junctionConfig=junction_config,
+            name_taken=getting_junction_name_taken(junction_config.name),
+            junction_count=getting_junction_count(traffic_flow.get("id"))
+        )
+        junction_input.validating_name()
+        junction_input.validating_maximum_junctions()
+        
+        if junction_input.errors:
+            return jsonify({
+                "success": False,
+                "error": junction_input.errors
+            }), 400
+        
         # Save the junction configuration
-        if not saving_junction_configuration(junction_config):
+        try:
+            saved = saving_junction_configuration(junction_config)
+        except ConfigurationNameTaken as e:
+            # Another request stored the name after it was checked
             return jsonify({
                 "success": False,
-                "error": "Junction configuration could not be saved"
+                "error": [str(e)]
+            }), 400
+        
+        if not saved:
+            return jsonify({
+                "success": False,
+                "error": ["Junction configuration could not be saved"]
             }), 400
         
         return jsonify({
@@ -474,14 +933,7 @@ def update_junction(junction_id):
         eastbound_data = junction_data.get("eastbound", {})
         westbound_data = junction_data.get("westbound", {})
         
-        # Delete the old junction configuration
-        if not deleting_junction_configuration(junction_id):
-            return jsonify({
-                "success": False,
-                "error": "Failed to delete existing junction configuration"
-            }), 500
-        
-        # Create a new junction configuration with the updated data
+        # Build the updated junction configuration
         junction_config = JunctionConfigModel(
             name=junction_data.get("name"),
             lanes={
@@ -547,14 +999,39 @@ def update_junction(junction_id):
                 "westbound": westbound_data.get("traffic_priority", 0),
                 "pedestrian": 0  # Default value
             },
-            traffic_flow_name=traffic_flow_name
+            traffic_flow_name=traffic_flow.get("name")
         )
         
-        # Save the junction configuration
-        if not saving_junction_configuration(junction_config):
+        # Moving the junction to another traffic flow counts against that flow's cap
+        moving = traffic_flow.get("name") != existing_junction.get("traffic_flow_config")
+        junction_input = JunctionConfigurationInput(
+            name=junction_config.name,
+            junctionConfig=junction_config,
+            name_taken=getting_junction_name_taken(junction_config.name, excluding_id=existing_junction.get("id")),
+            junction_count=getting_junction_count(traffic_flow.get("id")) if moving else 0
+        )
+        junction_input.validating_name()
+        junction_input.validating_maximum_junctions()
+        
+        if junction_input.errors:
+            return jsonify({
+                "success": False,
+                "error": junction_input.errors
+            }), 400
+        
+        # Update the row in place so the junction keeps its ID
+        try:
+            updated = updating_junction_configuration(existing_junction.get("id"), junction_config)
+        except ConfigurationNameTaken as e:
+            return jsonify({
+                "success": False,
+                "error": [str(e)]
+            }), 400
+        
+        if not updated:
             return jsonify({
                 "success": False,
-                "error": "Junction configuration could not be saved"
+                "error": ["Junction configuration could not be saved"]
             }), 400
         
         return jsonify({
@@ -590,46 +1067,85 @@ def delete_junction(junction_id):
 
 @app.route('/api/traffic-flows/<flow_id>/junctions', methods=['GET'])
 def get_junction_configurations(flow_id):
-    """Gets junction configurations for a specific traffic flow."""
+    """Gets junction configurations for a specific traffic flow, optionally filtered and sorted."""
     try:
-        junctions = get_functions_for_traffic_flow(flow_id)
+        traffic_flow = getting_traffic_flow(flow_id)
         
-        if junctions is None:
+        if not traffic_flow:
             return jsonify({"error": "Traffic flow not found"}), 404
-            
-        transformed_junctions = []
-        for junction in junctions:
-            directions = ["northbound", "southbound", "eastbound", "westbound"]
-            
-            # Extract lane counts and boolean options
-            total_lanes = 0
-            has_left_turn = False
-            has_bus_cycle = False
-            
-            for direction in directions:
-                if direction in junction:
-                    dir_data = junction[direction]
-                    total_lanes += dir_data.get("num_lanes", 0)
-                    has_left_turn = has_left_turn or dir_data.get("enable_left_turn_lane", False)
-                    has_bus_cycle = has_bus_cycle or dir_data.get("enable_bus_cycle_lane", False)
-            
-            average_lanes = total_lanes // len(directions) if directions else 0
-            
-            transformed_junctions.append({
-                "id": str(junction.get("id", "")),
-                "name": junction.get("name", ""),
-                "lanes": average_lanes,
-                "hasLeftTurnLanes": has_left_turn,
-                "hasBusCycleLanes": has_bus_cycle,
-                "metrics": junction.get("metrics", {})
-            })
         
-        return jsonify(transformed_junctions)
+        list_query = ListQueryInput(
+            args=request.args,
+            range_fields=JUNCTION_RANGE_FIELDS,
+            flag_fields=JUNCTION_FLAG_FIELDS,
+            sort_fields=("id", "name") + JUNCTION_RANGE_FIELDS,
+            output_fields=JUNCTION_OUTPUT_FIELDS
+        )
+        
+        if not list_query.validate():
+            return jsonify({"error": list_query.errors}), 400
+        
+        junctions = getting_junction_summaries(
+            list_query.filters, list_query.sort, traffic_flow_id=traffic_flow.get("id"),
+            after=list_query.after, limit=list_query.limit + 1, with_metrics=list_query.selects("metrics")
+        )
+        
+        return paginated_response(list_query, junctions, JUNCTION_SORT_KEYS, transforming_junction_summary)
         
     except Exception as e:
         print(f"Error in get_junction_configurations: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/junctions', methods=['GET'])
+def get_junctions():
+    """Gets junction configurations across all traffic flows, filtered and sorted by lanes, features and efficiency."""
+    try:
+        list_query = ListQueryInput(
+            args=request.args,
+            range_fields=JUNCTION_RANGE_FIELDS,
+            flag_fields=JUNCTION_FLAG_FIELDS,
+            sort_fields=("id", "name") + JUNCTION_RANGE_FIELDS,
+            output_fields=JUNCTION_OUTPUT_FIELDS
+        )
+        
+        if not list_query.validate():
+            return jsonify({"error": list_query.errors}), 400
+        
+        junctions = getting_junction_summaries(
+            list_query.filters, list_query.sort, after=list_query.after, limit=list_query.limit + 1,
+            with_metrics=list_query.selects("metrics")
+        )
+        
+        return paginated_response(list_query, junctions, JUNCTION_SORT_KEYS, transforming_junction_summary)
+        
+    except Exception as e:
+        print(f"Error in get_junctions: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/configurations/export', methods=['GET'])
+def export_configurations():
+    """Streams every traffic flow and junction configuration as NDJSON."""
+    return Response(
+        stream_with_context(exporting_configurations()),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=configurations.ndjson"}
+    )
+
+@app.route('/api/configurations/import', methods=['POST'])
+def import_configurations():
+    """Imports NDJSON traffic flow and junction records, streaming back each failure and a summary."""
+    batch_size = request.args.get("batch_size", IMPORT_BATCH_SIZE, type=int)
+    
+    if not 1 <= batch_size <= 5000:
+        return jsonify({"error": "Batch size must be between 1 and 5000"}), 400
+    
+    def generate():
+        # The body is read line by line as the import goes
+        for result in importing_configurations(request.stream, batch_size=batch_size):
+            yield json.dumps(result) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 # Add any missing API routes from your original application here
 
 if __name__ == '__main__':
@@ -0,0 +1,163 @@
+import json
+import os
+
+from .models.traffic_flow import TrafficFlow as TrafficFlowModel
+from .models.traffic_flow_input import TrafficFlowInput, MAX_TRAFFIC_FLOW_CONFIGURATIONS
+from .models.junction_config import JunctionConfiguration as JunctionConfigModel
+from .models.junction_config_input import JunctionConfigurationInput, MAX_JUNCTIONS_PER_TRAFFIC_FLOW
+from .storage import streaming_configurations, bulk_saving_configurations
+
+DIRECTIONS = ['northbound', 'southbound', 'eastbound', 'westbound']
+
+# Records validated and inserted per transaction
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 500))
+
+
+def exporting_configurations():
+    """
+    Yields every stored configuration as one NDJSON line.
+
+    Traffic flows come first, each {"type": "traffic_flow", ...}, then
+    junctions, each {"type": "junction", ...}, in the same shapes the GET
+    endpoints return, so the output can be imported again as it is.
+    """
+    for kind, data in streaming_configurations():
+        yield json.dumps({"type": kind, **data}) + "\n"
+
+
+def _validating_traffic_flow(record: dict) -> tuple:
+    """Checks a traffic flow record with the same rules as creating one; returns (data, errors)."""
+    flows = record.get("flows", {})
+    if not isinstance(flows, dict) or not all(isinstance(flows.get(d, {}), dict) for d in DIRECTIONS):
+        return None, ["Traffic flow 'flows' must map each direction to its incoming flow and exits."]
+
+    # Uniqueness and the configuration cap are checked per batch against the database
+    traffic_flow_input = TrafficFlowInput(name=record.get("name", ""), flows=flows)
+    traffic_flow_input.validating_flow_rates()
+    for direction in DIRECTIONS:
+        exits = flows[direction].get("exits", {})
+        if not isinstance(exits, dict) or not all(isinstance(flow, int) for flow in exits.values()):
+            traffic_flow_input.errors.append(f"Exit flows for {direction} must be whole numbers in vph.")
+    # Exit totals can only be compared with the incoming flow once both are numbers
+    if traffic_flow_input.errors:
+        return None, traffic_flow_input.errors
+    traffic_flow_input.validating_exit_distributions()
+    traffic_flow_input.validating_demand_profiles()
+    traffic_flow_input.validating_name()
+    if traffic_flow_input.errors:
+        return None, traffic_flow_input.errors
+
+    traffic_flow = TrafficFlowModel(
+        name=record["name"],
+        flow_rates={d: flows[d].get("incoming_flow", 0) for d in DIRECTIONS},
+        exit_distributions={d: flows[d].get("exits", {}) for d in DIRECTIONS},
+        demand_profiles={d: flows[d]["profile"] for d in DIRECTIONS if flows[d].get("profile")}
+    )
+    return traffic_flow.to_dict(), []
+
+
+def _validating_junction(record: dict) -> tuple:
+    """Checks a junction record with the same rules as creating one; returns (data, errors)."""
+    if not all(isinstance(record.get(d), dict) for d in DIRECTIONS):
+        return None, ["Junction configuration must have northbound, southbound, eastbound and westbound settings."]
+    if not record.get("traffic_flow_config") or not isinstance(record.get("traffic_flow_config"), str):
+        return None, ["Junction configuration must name its traffic flow in 'traffic_flow_config'."]
+
+    # Uniqueness and the per-flow cap are checked per batch against the database
+    junction_config = JunctionConfigModel.from_dict(record)
+    junction_input = JunctionConfigurationInput(name=junction_config.name, junctionConfig=junction_config)
+    junction_input.validating_name()
+    junction_input.validating_lanes()
+    if junction_input.errors:
+        return None, junction_input.errors
+
+    # Stored in the same shape the POST endpoint stores, keeping metrics from an export
+    data = junction_config.to_dict()
+    if isinstance(record.get("metrics"), dict):
+        data["metrics"] = record["metrics"]
+    return data, []
+
+
+def _saving_batch(traffic_flows: list, junctions: list) -> tuple:
+    """Saves one batch; returns ({line: errors} for the records not saved, number saved)."""
+    saved = bulk_saving_configurations(
+        traffic_flows, junctions, MAX_TRAFFIC_FLOW_CONFIGURATIONS, MAX_JUNCTIONS_PER_TRAFFIC_FLOW
+    )
+    if saved is None:
+        failed = {line: ["Batch could not be saved"] for line, _ in traffic_flows + junctions}
+        return failed, 0
+
+    errors, count = saved
+    return {line: [error] for line, error in errors.items()}, count
+
+
+def importing_configurations(lines, batch_size: int = IMPORT_BATCH_SIZE):
+    """
+    Imports NDJSON configuration records, yielding a result for each record that fails.
+
+    Lines are read as they arrive and saved batch_size records at a time,
+    each batch in its own transaction, so a bad record or batch does not
+    undo the rest. A junction may refer to a traffic flow stored already
+    or earlier in the input. Failures are yielded as {"type": "error",
+    "line", "name", "errors"} and the import ends with {"type": "summary",
+    "created", "failed"}.
+    """
+    traffic_flows = []
+    junctions = []
+    names = {}
+    created = 0
+    failed = 0
+
+    def flush():
+        nonlocal created, failed
+        errors, count = _saving_batch(traffic_flows, junctions)
+        created += count
+        failed += len(errors)
+        results = [
+            {"type": "error", "line": line, "name": names.get(line), "errors": record_errors}
+            for line, record_errors in sorted(errors.items())
+        ]
+        traffic_flows.clear()
+        junctions.clear()
+        names.clear()
+        return results
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            failed += 1
+            yield {"type": "error", "line": line_number, "name": None, "errors": ["Line is not a JSON object."]}
+            continue
+
+        kind = record.get("type")
+        try:
+            if kind == "traffic_flow":
+                data, errors = _validating_traffic_flow(record)
+            elif kind == "junction":
+                data, errors = _validating_junction(record)
+            else:
+                data, errors = None, ["Record type must be 'traffic_flow' or 'junction'."]
+        except Exception as e:
+            # A malformed record fails on its own rather than ending the import
+            data, errors = None, [f"Record could not be validated: {e}"]
+
+        if errors:
+            failed += 1
+            yield {"type": "error", "line": line_number, "name": record.get("name"), "errors": errors}
+            continue
+
+        names[line_number] = data["name"]
+        (traffic_flows if kind == "traffic_flow" else junctions).append((line_number, data))
+        if len(traffic_flows) + len(junctions) >= batch_size:
+            yield from flush()
+
+    if traffic_flows or junctions:
+        yield from flush()
+
+    yield {"type": "summary", "created": created, "failed": failed}
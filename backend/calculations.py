@@ -1,4 +1,150 @@
-import math
+import numpy as np
+
+from .simulation import DIRECTIONS
+
+
+class JunctionBatch:
+    """
+    Struct-of-arrays view of N junction x traffic flow pairs.
+
+    Every per-direction attribute is an (N, 4) array with columns in
+    north/south/east/west order, so whole studies are scored with a
+    handful of array operations instead of a loop per junction.
+    """
+
+    def __init__(self, flow_rate, num_lanes, priority, bus_cycle_lane, crossing):
+        self.flow_rate = np.asarray(flow_rate, dtype=np.float64)
+        self.num_lanes = np.asarray(num_lanes, dtype=np.float64)
+        self.priority = np.asarray(priority, dtype=np.int64)
+        self.bus_cycle_lane = np.asarray(bus_cycle_lane, dtype=bool)
+        self.crossing = np.asarray(crossing, dtype=bool)
+
+    def __len__(self):
+        return self.flow_rate.shape[0]
+
+    @classmethod
+    def from_configs(cls, pairs) -> 'JunctionBatch':
+        """
+        Builds a batch from (junction_data, flow_data) dictionaries as stored in the database.
+
+        The archived calculator read each direction's flow as its exits and
+        its priority and crossing from 'priority' and 'has_crossing'; these
+        are the incoming flow, 'traffic_priority' and
+        'pedestrian_crossing_enabled' in the stored format.
+        """
+        pairs = list(pairs)
+        shape = (len(pairs), len(DIRECTIONS))
+        flow_rate = np.zeros(shape)
+        num_lanes = np.ones(shape)
+        priority = np.zeros(shape, dtype=np.int64)
+        bus_cycle_lane = np.zeros(shape, dtype=bool)
+        crossing = np.zeros(shape, dtype=bool)
+
+        for i, (junction_data, flow_data) in enumerate(pairs):
+            for d, direction in enumerate(DIRECTIONS):
+                dir_config = junction_data.get(direction, {})
+                dir_flow = flow_data.get(direction, {})
+
+                flow_rate[i, d] = dir_flow.get("incoming_flow", 0) or sum(dir_flow.get("exits", {}).values(), 0)
+                num_lanes[i, d] = dir_config.get("num_lanes", 1)
+                priority[i, d] = dir_config.get("traffic_priority", 0)
+                bus_cycle_lane[i, d] = bool(dir_config.get("enable_bus_cycle_lane", False))
+                crossing[i, d] = bool(dir_config.get("pedestrian_crossing_enabled", False))
+
+        return cls(flow_rate, num_lanes, priority, bus_cycle_lane, crossing)
+
 
 class TrafficJunctionCalculator:
-    
\ No newline at end of file
+    """
+    Vectorised versions of the archived junction formulas.
+
+    Each method takes (N, 4) arrays and returns arrays, scoring every
+    junction in a batch at once with the same results as the archived
+    per-junction calculator.
+    """
+
+    def __init__(self):
+        self.max_red_duration = 120  # Maximum red light duration in seconds
+        self.cycle_duration = 240    # Total traffic light cycle in seconds
+        self.base_processing_rate = 1800  # Base vehicles per hour through green light
+
+        # Constants from requirements
+        self.priority_factors = {0: 1.0, 1: 0.8, 2: 0.6, 3: 0.4, 4: 0.2}
+        self.vehicle_factors = {'car': 1.0, 'bus': 2.0, 'bicycle': 0.5}
+        self.env_bonuses = {'bus_lane': 20, 'cycle_lane': 15, 'pedestrian_crossing': 10}
+
+    def calculate_junction_metrics(self, batch: JunctionBatch) -> dict:
+        """Returns per-direction wait times and queue lengths, shaped (N, 4), plus per-junction scores, shaped (N,)."""
+        avg_wait, max_wait = self.calculate_wait_times(batch.flow_rate, batch.num_lanes, batch.priority)
+        queue_length = self.calculate_queue_length(batch.flow_rate, batch.num_lanes, batch.bus_cycle_lane)
+
+        sustainability_score = self.calculate_sustainability_score(batch)
+        efficiency_score = self.calculate_efficiency_score(avg_wait, queue_length, sustainability_score)
+
+        return {
+            'average_wait_time': avg_wait,
+            'maximum_wait_time': max_wait,
+            'queue_length': queue_length,
+            'sustainability_score': sustainability_score,
+            'efficiency_score': efficiency_score
+        }
+
+    def calculate_wait_times(self, flow_rate, num_lanes, priority_level):
+        """Calculate average and maximum wait times based on flow and priority"""
+        # Levels outside the table count as no priority
+        lookup = np.array([self.priority_factors[level] for level in range(len(self.priority_factors))])
+        known = (priority_level >= 0) & (priority_level < len(lookup))
+        priority_factor = np.where(known, lookup[np.clip(priority_level, 0, len(lookup) - 1)], 1.0)
+        base_wait = (flow_rate * priority_factor) / (num_lanes * self.base_processing_rate) * self.cycle_duration
+
+        return base_wait, base_wait * 1.5  # Max wait is 50% higher than average
+
+    def calculate_queue_length(self, flow_rate, num_lanes, has_bus_lane):
+        """Calculate maximum queue length considering vehicle types"""
+        base_queue = (flow_rate * self.max_red_duration / 3600) / num_lanes
+        return np.where(has_bus_lane, base_queue * self.vehicle_factors['bus'], base_queue)
+
+    def calculate_sustainability_score(self, batch: JunctionBatch):
+        """Calculate sustainability score based on environmental features"""
+        # As archived, bonuses are added to a base of 100 and capped, so every junction scores 100
+        total_bonus = (batch.bus_cycle_lane.sum(axis=1) * self.env_bonuses['bus_lane']
+                       + batch.crossing.sum(axis=1) * self.env_bonuses['pedestrian_crossing'])
+        return np.minimum(100, 100 + total_bonus).astype(np.float64)
+
+    def calculate_efficiency_score(self, average_wait_time, queue_length, sustainability_score):
+        """Calculate final efficiency score combining all metrics"""
+        weights = {
+            'wait_time': 0.35,
+            'queue_length': 0.25,
+            'sustainability': 0.20,
+            'flow': 0.20  # Never scored by the archived calculator
+        }
+
+        wait_score = np.maximum(0, 100 - average_wait_time.mean(axis=1) / 2)
+        queue_score = np.maximum(0, 100 - queue_length.mean(axis=1) * 2)
+        score = (wait_score * weights['wait_time']
+                 + queue_score * weights['queue_length']
+                 + sustainability_score * weights['sustainability'])
+
+        return np.clip(score, 0, 100)
+
+    def metrics_to_dicts(self, metrics: dict) -> list:
+        """Splits batch metrics back into one dictionary per junction, as the archived calculator returned"""
+        results = []
+        for i in range(len(metrics['efficiency_score'])):
+            result = {
+                direction: {
+                    'average_wait_time': float(metrics['average_wait_time'][i, d]),
+                    'maximum_wait_time': float(metrics['maximum_wait_time'][i, d]),
+                    'queue_length': float(metrics['queue_length'][i, d])
+                }
+                for d, direction in enumerate(DIRECTIONS)
+            }
+            result['sustainability_score'] = float(metrics['sustainability_score'][i])
+            result['efficiency_score'] = float(metrics['efficiency_score'][i])
+            results.append(result)
+        return results
+
+
+# Create singleton instance
+calculator = TrafficJunctionCalculator()
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models.db_models import get_session
+
+
+def request_session():
+    """Returns the session shared by every storage call in the current app context."""
+    if "db_session" not in g:
+        g.db_session = get_session()
+    return g.db_session
+
+
+def _request_has_written(session) -> bool:
+    """
+    Whether the request transaction holds writes a failed call must not discard.
+
+    pysqlite only opens a transaction at the first write, and a SAVEPOINT
+    issued before then would open it instead, letting its RELEASE commit
+    the request early. Until then there is nothing to protect, so a
+    failed call can roll back the whole (empty) transaction. Other
+    drivers are always inside a transaction and always get a savepoint.
+    """
+    return getattr(session.connection().connection, "in_transaction", True)
+
+
+@contextmanager
+def session_scope(shared: bool = True, engine=None):
+    """
+    Provides the session for one storage call.
+
+    Inside a Flask app context the call joins the request's session, in a
+    savepoint once the request has written, so a failed call is undone
+    without discarding the request's other writes; the request's single transaction is committed
+    or rolled back by ending_request_session. Outside an app context, or
+    with shared=False for writes other threads must see straight away, the
+    call gets a session and transaction of its own. Migrations pass the
+    engine they are run against, before the shared factory is bound.
+    """
+    if shared and engine is None and has_app_context():
+        session = request_session()
+        # A failed call only undoes its own changes, as callers report the error and carry on
+        savepoint = session.begin_nested() if _request_has_written(session) else None
+        try:
+            yield session
+            if savepoint is not None:
+                savepoint.commit()
+            else:
+                session.flush()
+        except Exception:
+            (savepoint or session).rollback()
+            raise
+        return
+
+    session = get_session(engine)
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def ending_request_session(commit: bool = True) -> bool:
+    """Commits (or rolls back) and releases the request's session; returns False if the commit failed."""
+    session = g.pop("db_session", None)
+    if session is None:
+        return True
+    try:
+        if commit:
+            session.commit()
+        else:
+            session.rollback()
+        return True
+    except SQLAlchemyError as e:
+        print(f"Database error ending request transaction: {e}")
+        session.rollback()
+        return False
+    finally:
+        session.close()
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .optimizer import optimise_junction
+from .simulation_service import run_cached_simulation
+from .storage import (
+    getting_traffic_flow,
+    getting_junction_configuration,
+    saving_simulation_job,
+    getting_simulation_job,
+    updating_simulation_job,
+    updating_simulation_job_progress,
+    requesting_simulation_job_cancellation,
+    failing_interrupted_simulation_jobs
+)
+
+JOB_KINDS = ("simulate", "replications", "optimize")
+
+# Jobs run at the same time per process; each may still fan out to the process pool
+MAX_CONCURRENT_JOBS = int(os.environ.get("SIMULATION_JOB_WORKERS", 2))
+
+# Seconds between progress writes per job; cancellation is noticed at the next write
+PROGRESS_INTERVAL = float(os.environ.get("SIMULATION_JOB_PROGRESS_INTERVAL", 2))
+
+
+class JobCancelled(Exception):
+    """Raised from a progress callback to stop a job whose cancellation was requested."""
+
+
+class SimulationJobQueue:
+    """
+    Runs long simulations off the request thread.
+
+    Jobs are persisted in the simulation_jobs table so any worker process can
+    report their status, and run on a bounded thread pool in the process that
+    accepted them. Cancellation is cooperative: a flag in the database is
+    checked whenever the job reports progress.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_JOBS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Jobs orphaned by a previous process will never finish
+                failing_interrupted_simulation_jobs()
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="simulation-job")
+            return self._executor
+
+    def submit(self, junction_id, kind: str, options: dict):
+        """Queues a job and returns its ID, or None if it could not be stored."""
+        executor = self._get_executor()
+        job_id = uuid.uuid4().hex
+
+        if not saving_simulation_job(job_id, junction_id, kind, options):
+            return None
+
+        future = executor.submit(self._run, job_id, junction_id, kind, options)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """Requests cancellation; queued jobs in this process are dropped immediately."""
+        if not requesting_simulation_job_cancellation(job_id):
+            return False
+
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            updating_simulation_job(job_id, status="cancelled")
+        return True
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id, junction_id, kind, options):
+        job = getting_simulation_job(job_id)
+        if job is None:
+            return
+        if updating_simulation_job_progress(job_id, 0.0):
+            updating_simulation_job(job_id, status="cancelled")
+            return
+
+        updating_simulation_job(job_id, status="running")
+
+        last_written = time.monotonic()
+
+        def progress(fraction):
+            # Simulations report every snapshot, far more often than anyone polls
+            nonlocal last_written
+            now = time.monotonic()
+            if now - last_written < PROGRESS_INTERVAL:
+                return
+            last_written = now
+            if updating_simulation_job_progress(job_id, fraction):
+                raise JobCancelled()
+
+        try:
+            junction = getting_junction_configuration(junction_id)
+            if not junction:
+                raise LookupError("Junction configuration not found")
+
+            traffic_flow = getting_traffic_flow(junction.get("traffic_flow_config"))
+            if not traffic_flow:
+                raise LookupError("Traffic flow configuration not found")
+
+            if kind == "optimize":
+                results = optimise_junction(
+                    junction_data=junction,
+                    flow_data=traffic_flow.get("flows", {}),
+                    progress=progress,
+                    **options
+                )
+            else:
+                results = run_cached_simulation(junction, traffic_flow, progress=progress, **options)
+
+            updating_simulation_job(job_id, status="succeeded", progress=1.0, results=results)
+
+        except JobCancelled:
+            updating_simulation_job(job_id, status="cancelled")
+        except Exception as e:
+            print(f"Error in simulation job {job_id}: {str(e)}")
+            updating_simulation_job(job_id, status="failed", error=str(e)[:500])
+
+
+job_queue = SimulationJobQueue()
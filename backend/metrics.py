@@ -0,0 +1,207 @@
+import atexit
+import bisect
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .processes import process_alive
+from .result_cache import simulation_cache, config_cache
+
+# Upper bounds in seconds, shared by every histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS = {
+    "http_requests_total": ("counter", "Requests handled, by route, method and status."),
+    "http_request_errors_total": ("counter", "Requests answered with a 5xx status, by route and method."),
+    "http_request_duration_seconds": ("histogram", "Time to build each response, by route and method."),
+    "storage_call_duration_seconds": ("histogram", "Time spent in each storage function."),
+    "simulation_phase_duration_seconds": ("histogram", "Time spent in each phase of a simulation request."),
+    "cache_hits_total": ("counter", "In-process cache lookups that found an entry."),
+    "cache_misses_total": ("counter", "In-process cache lookups that did not."),
+    "cache_entries": ("gauge", "Entries held by the in-process caches of live processes.")
+}
+
+CACHES = {"simulation": simulation_cache, "configuration": config_cache}
+
+# With several worker processes, each writes its metrics here and /api/metrics reports their sum
+METRICS_DIR = os.environ.get("METRICS_DIR")
+FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms for this process, rendered in the Prometheus text format.
+
+    Series are keyed by metric name and a sorted tuple of label pairs.
+    When METRICS_DIR is set, a background thread writes this process's
+    series there every FLUSH_INTERVAL seconds and rendering sums the
+    files of every process, so a scrape sees the whole server whichever
+    worker answers it. A forked child starts with empty series.
+    """
+
+    def __init__(self, metrics_dir: str = None):
+        self.metrics_dir = metrics_dir
+        self._resetting()
+        os.register_at_fork(after_in_child=self._resetting)
+
+    def _resetting(self):
+        self._counters = {}
+        self._histograms = {}  # key -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def counting(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observing(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            index = bisect.bisect_left(BUCKETS, seconds)
+            if index < len(BUCKETS):
+                histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextmanager
+    def timing(self, name: str, **labels):
+        """Observes how long the block takes, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observing(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        """This process's series, plus its cache statistics, as JSON-serialisable lists."""
+        with self._lock:
+            counters = [[name, labels, value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, labels, list(buckets), total, count]
+                          for (name, labels), (buckets, total, count) in self._histograms.items()]
+        gauges = []
+        for cache_name, cache in CACHES.items():
+            stats = cache.stats()
+            labels = [["cache", cache_name]]
+            counters.append(["cache_hits_total", labels, stats["hits"]])
+            counters.append(["cache_misses_total", labels, stats["misses"]])
+            gauges.append(["cache_entries", labels, stats["size"]])
+        return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def flushing(self):
+        """Writes this process's snapshot to the metrics directory."""
+        if not self.metrics_dir:
+            return
+        path = os.path.join(self.metrics_dir, f"{os.getpid()}.json")
+        try:
+            with open(path + ".tmp", "w") as file:
+                json.dump(self.snapshot(), file)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error writing metrics to {path}: {e}")
+
+    def starting_flusher(self):
+        """Starts this process's flush thread; called from requests so a preforking master never holds one."""
+        if not self.metrics_dir or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            threading.Thread(target=self._flushing_periodically, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flushing)
+
+    def _flushing_periodically(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flushing()
+
+    def _snapshots(self) -> list:
+        if not self.metrics_dir:
+            return [self.snapshot()]
+
+        self.flushing()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.metrics_dir, "*.json")):
+            try:
+                with open(path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue  # removed or being replaced
+        return snapshots
+
+    def rendering(self) -> str:
+        """All series in the Prometheus text exposition format."""
+        counters = {}
+        histograms = {}
+        gauges = {}
+        for snapshot in self._snapshots():
+            # Counts from exited workers still add to the totals, but their caches are gone
+            live = snapshot["pid"] == os.getpid() or process_alive(snapshot["pid"])
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+            for name, labels, value in snapshot["gauges"]:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0) + (value if live else 0)
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = {"counter": counters, "histogram": histograms, "gauge": gauges}[kind]
+            keys = sorted(key for key in series if key[0] == name)
+            if not keys:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in keys:
+                labels = key[1]
+                if kind != "histogram":
+                    lines.append(f"{name}{_formatting_labels(labels)} {_formatting_value(series[key])}")
+                    continue
+                buckets, total, count = series[key]
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, buckets):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_formatting_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_formatting_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_formatting_labels(labels)} {_formatting_value(total)}")
+                lines.append(f"{name}_count{_formatting_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _formatting_labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _formatting_value(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = MetricsRegistry(METRICS_DIR)
+
+
+def timed_storage_call(function):
+    """Records how long each call to a storage function takes."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with metrics.timing("storage_call_duration_seconds", function=function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,273 @@
+import hashlib
+import inspect
+import json
+import os
+
+from sqlalchemy import (
+    Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, LargeBinary, Index, MetaData, Table,
+    func, inspect as inspect_database, text
+)
+from sqlalchemy.exc import IntegrityError
+
+from .db_session import session_scope
+from .models.db_models import TrafficFlow, JunctionConfiguration, SimulationJob, SchemaMigration, SessionFactory
+
+
+def creating_tables(engine):
+    """
+    Create the configuration, cache, run and job tables as they were first defined, where they don't exist yet.
+    
+    The tables are declared here rather than taken from the models, so this
+    migration does the same thing however the models change later; the
+    columns added since come from the migrations after it.
+    """
+    metadata = MetaData()
+    Table(
+        "traffic_flows", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(100), unique=True, nullable=False),
+        Column("flow_data", JSON, nullable=False)
+    )
+    Table(
+        "junction_configurations", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(100), unique=True, nullable=False),
+        Column("traffic_flow_id", Integer, ForeignKey("traffic_flows.id"), nullable=False),
+        Column("junction_data", JSON, nullable=False),
+        Column("metrics_data", JSON, nullable=True)
+    )
+    Table(
+        "simulation_cache", metadata,
+        Column("config_hash", String(64), primary_key=True),
+        Column("junction_name", String(100), nullable=False, index=True),
+        Column("traffic_flow_name", String(100), nullable=False, index=True),
+        Column("engine_version", String(20), nullable=False),
+        Column("results", JSON, nullable=False),
+        Column("created_at", DateTime, nullable=False, server_default=func.now())
+    )
+    Table(
+        "simulation_runs", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("junction_id", Integer, ForeignKey("junction_configurations.id"), nullable=False),
+        Column("junction_name", String(100), nullable=False),
+        Column("traffic_flow_name", String(100), nullable=False),
+        Column("config_hash", String(64), nullable=False, index=True),
+        Column("engine_version", String(20), nullable=False),
+        Column("duration", Integer, nullable=False),
+        Column("seed", Integer, nullable=True),
+        Column("replications", Integer, nullable=False),
+        Column("efficiency_score", Float, nullable=True),
+        Column("sustainability_score", Float, nullable=True),
+        Column("average_wait_time", Float, nullable=True),
+        Column("max_queue_length", Integer, nullable=True),
+        Column("results", JSON, nullable=False),
+        Column("interval", Integer, nullable=True),
+        Column("series", LargeBinary, nullable=True),
+        Column("created_at", DateTime, nullable=False, server_default=func.now(), index=True),
+        Index("ix_simulation_runs_junction_created", "junction_id", "created_at")
+    )
+    Table(
+        "simulation_jobs", metadata,
+        Column("id", String(32), primary_key=True),
+        Column("junction_id", String(100), nullable=False),
+        Column("kind", String(20), nullable=False),
+        Column("options", JSON, nullable=False),
+        Column("status", String(20), nullable=False, index=True),
+        Column("progress", Float, nullable=False),
+        Column("cancel_requested", Boolean, nullable=False),
+        Column("worker_pid", Integer, nullable=True),
+        Column("results", JSON, nullable=True),
+        Column("error", String(500), nullable=True),
+        Column("created_at", DateTime, nullable=False, server_default=func.now()),
+        Column("started_at", DateTime, nullable=True),
+        Column("finished_at", DateTime, nullable=True)
+    )
+    metadata.create_all(engine, checkfirst=True)
+
+
+def adding_summary_columns(engine):
+    """Add the summary columns to tables created before them, with their indexes, and backfill them."""
+    added = {
+        TrafficFlow: [
+            ("northbound_flow", "INTEGER"), ("southbound_flow", "INTEGER"), ("eastbound_flow", "INTEGER"),
+            ("westbound_flow", "INTEGER"), ("total_flow", "INTEGER")
+        ],
+        JunctionConfiguration: [
+            ("total_lanes", "INTEGER"), ("has_left_turn_lane", "BOOLEAN"), ("has_bus_lane", "BOOLEAN"),
+            ("has_cycle_lane", "BOOLEAN"), ("has_pedestrian_crossing", "BOOLEAN"), ("efficiency_score", "FLOAT")
+        ]
+    }
+    inspector = inspect_database(engine)
+    backfill = []
+    
+    with engine.begin() as connection:
+        for model, columns in added.items():
+            table = model.__tablename__
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            missing = [(name, column_type) for name, column_type in columns if name not in existing]
+            if not missing:
+                continue
+            
+            for name, column_type in missing:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{name} ON {table} ({name})"))
+            backfill.append(model)
+    
+    if backfill:
+        session = SessionFactory(bind=engine)
+        try:
+            for model in backfill:
+                for row in session.query(model).all():
+                    row.refresh_summary()
+            session.commit()
+        finally:
+            session.close()
+
+
+def importing_json_configurations(engine):
+    """
+    Import configurations from the JSON file the app stored them in before the database.
+    Configurations whose names are already stored are skipped, so running it again adds nothing.
+    Returns whether there was a file to import; a failed import raises and is rolled back.
+    """
+    JSON_FILE_PATH = "backend/database/storing_configs.json"
+    
+    if not os.path.exists(JSON_FILE_PATH):
+        print("No JSON file found for migration")
+        return False
+    
+    with open(JSON_FILE_PATH, "r") as file:
+        data = json.load(file)
+    
+    traffic_flows = data.get("traffic_flow_configurations", {})
+    junction_configs = data.get("junction_configurations", {})
+    
+    # Runs in its own transaction so a failed first request can't undo it
+    with session_scope(shared=False, engine=engine) as session:
+        # First, migrate traffic flows
+        name_to_id_map = dict(session.query(TrafficFlow.name, TrafficFlow.id).all())  # Traffic flow names to their IDs
+        stored_junctions = {name for (name,) in session.query(JunctionConfiguration.name).all()}
+        
+        for name, flow_data in traffic_flows.items():
+            if name in name_to_id_map:
+                continue
+            
+            # Create a proper flow object structure if needed
+            if "flows" not in flow_data:
+                # Convert old format to new format
+                restructured_data = {
+                    "name": name,
+                    "flows": {}
+                }
+                
+                for direction in ["northbound", "southbound", "eastbound", "westbound"]:
+                    if direction in flow_data:
+                        exit_data = flow_data[direction]
+                        
+                        # Calculate total flow
+                        total_flow = sum(exit_data.values())
+                        
+                        restructured_data["flows"][direction] = {
+                            "incoming_flow": total_flow,
+                            "exits": exit_data
+                        }
+                
+                flow_data = restructured_data
+            
+            tf = TrafficFlow.from_dict(flow_data)
+            session.add(tf)
+            session.flush()  # To get the ID
+            name_to_id_map[name] = tf.id
+        
+        # Then, migrate junction configurations
+        for name, junction_data in junction_configs.items():
+            if name in stored_junctions:
+                continue
+            
+            traffic_flow_name = junction_data.get("traffic_flow_config")
+            
+            if traffic_flow_name in name_to_id_map:
+                traffic_flow_id = name_to_id_map[traffic_flow_name]
+                jc = JunctionConfiguration.from_dict(junction_data, traffic_flow_id)
+                session.add(jc)
+        
+        return True
+
+
+def adding_simulation_job_worker_token(engine):
+    """Add the worker token that tells a job's live owner apart from a process reusing its PID."""
+    columns = {column["name"] for column in inspect_database(engine).get_columns(SimulationJob.__tablename__)}
+    if "worker_token" not in columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE simulation_jobs ADD COLUMN worker_token VARCHAR(200)"))
+
+
+def indexing_junction_traffic_flow(engine):
+    """Index junctions by traffic flow, for per-flow counts, filters and the grouped flow list."""
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_junction_configurations_traffic_flow_id "
+            "ON junction_configurations (traffic_flow_id)"
+        ))
+
+
+# Applied in order, each once per database; add new schema changes to the end rather than editing these.
+# Each migration names the tables and columns it creates itself, so its checksum covers everything it does.
+MIGRATIONS = [
+    ("0001_create_tables", creating_tables),
+    ("0002_summary_columns", adding_summary_columns),
+    ("0003_import_json_configurations", importing_json_configurations),
+    ("0004_simulation_job_worker_token", adding_simulation_job_worker_token),
+    ("0005_junction_traffic_flow_index", indexing_junction_traffic_flow)
+]
+
+
+def _checksum(migration) -> str:
+    return hashlib.sha256(inspect.getsource(migration).encode("utf-8")).hexdigest()
+
+
+def run_migrations(engine) -> list:
+    """
+    Apply the migrations this database hasn't recorded yet; returns their names.
+    
+    Applied migrations are recorded in schema_migrations with a checksum of
+    their source, so a boot with nothing pending costs one SELECT. A
+    recorded migration whose source has since changed is reported but not
+    run again. A migration that raises is not recorded and stops the run.
+    """
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    
+    session = SessionFactory(bind=engine)
+    try:
+        applied = dict(session.query(SchemaMigration.name, SchemaMigration.checksum).all())
+    finally:
+        session.close()
+    
+    ran = []
+    for name, migration in MIGRATIONS:
+        checksum = _checksum(migration)
+        if name in applied:
+            if applied[name] != checksum:
+                print(f"Warning: migration {name} has changed since it was applied; it will not be run again")
+            continue
+        
+        print(f"Applying migration {name}")
+        try:
+            migration(engine)
+        except Exception as e:
+            # Left unrecorded, so it is tried again on the next start
+            print(f"Migration {name} failed: {e}")
+            raise
+        
+        session = SessionFactory(bind=engine)
+        try:
+            session.add(SchemaMigration(name=name, checksum=checksum))
+            session.commit()
+        except IntegrityError:
+            # Another process applied and recorded it at the same time
+            session.rollback()
+        finally:
+            session.close()
+        ran.append(name)
+    
+    return ran
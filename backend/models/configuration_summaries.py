@@ -0,0 +1,43 @@
+class TrafficFlowSummary:
+    """What list views show of a traffic flow, read from its summary columns without the flow JSON."""
+
+    __slots__ = ("id", "name", "northbound_flow", "southbound_flow", "eastbound_flow",
+                 "westbound_flow", "total_flow", "junction_count")
+
+    def __init__(self, id: int, name: str, northbound_flow: int, southbound_flow: int,
+                 eastbound_flow: int, westbound_flow: int, total_flow: int, junction_count: int):
+        self.id = id
+        self.name = name
+        self.northbound_flow = northbound_flow or 0  # incoming vph
+        self.southbound_flow = southbound_flow or 0
+        self.eastbound_flow = eastbound_flow or 0
+        self.westbound_flow = westbound_flow or 0
+        self.total_flow = total_flow or 0
+        self.junction_count = junction_count
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class JunctionSummary:
+    """What list views show of a junction: its traffic flow's name, lane summary, feature flags and metrics."""
+
+    __slots__ = ("id", "name", "traffic_flow_config", "total_lanes", "has_left_turn_lane",
+                 "has_bus_lane", "has_cycle_lane", "has_pedestrian_crossing", "efficiency_score", "metrics")
+
+    def __init__(self, id: int, name: str, traffic_flow_config: str, total_lanes: int,
+                 has_left_turn_lane: bool, has_bus_lane: bool, has_cycle_lane: bool,
+                 has_pedestrian_crossing: bool, efficiency_score: float, metrics: dict = None):
+        self.id = id
+        self.name = name
+        self.traffic_flow_config = traffic_flow_config  # traffic flow name
+        self.total_lanes = total_lanes or 0
+        self.has_left_turn_lane = bool(has_left_turn_lane)
+        self.has_bus_lane = bool(has_bus_lane)
+        self.has_cycle_lane = bool(has_cycle_lane)
+        self.has_pedestrian_crossing = bool(has_pedestrian_crossing)
+        self.efficiency_score = efficiency_score
+        self.metrics = metrics or {}  # left empty when the listing didn't ask for metrics
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
@@ -1,9 +1,32 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, JSON, create_engine
+import os
+import threading
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, LargeBinary, Index, create_engine, event
+from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker, deferred
+from sqlalchemy.pool import QueuePool
 
 Base = declarative_base()
 
+# Connection settings, overridable from the environment
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///junction_sim.db")
+POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = int(os.environ.get("DATABASE_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.environ.get("DATABASE_POOL_RECYCLE", 1800))
+
+# Apply pending migrations when the engine is first created; turn off where a deploy step runs scripts/init_db.py
+RUN_MIGRATIONS_ON_STARTUP = os.environ.get("RUN_MIGRATIONS_ON_STARTUP", "1").lower() not in ("0", "false", "no")
+
+# Shared session factory, bound to the engine by get_engine
+SessionFactory = sessionmaker()
+
+_engine = None
+_engine_lock = threading.Lock()
+
+DIRECTIONS = ['northbound', 'southbound', 'eastbound', 'westbound']
+
 class TrafficFlow(Base):
     __tablename__ = 'traffic_flows'
     
@@ -13,6 +36,13 @@ class TrafficFlow(Base):
     # Store flow data as JSON
     flow_data = Column(JSON, nullable=False)
     
+    # Summary columns derived from flow_data on every write, so lists can filter and sort in SQL
+    northbound_flow = Column(Integer, index=True)
+    southbound_flow = Column(Integer, index=True)
+    eastbound_flow = Column(Integer, index=True)
+    westbound_flow = Column(Integer, index=True)
+    total_flow = Column(Integer, index=True)
+    
     # Relationship to junctions
     junctions = relationship("JunctionConfiguration", back_populates="traffic_flow", cascade="all, delete-orphan")
     
@@ -24,6 +54,17 @@ class TrafficFlow(Base):
             "flows": self.flow_data
         }
     
+    def refresh_summary(self):
+        """Recompute the per-direction incoming flows (vph) from flow_data"""
+        flows = self.flow_data or {}
+        total = 0
+        for direction in DIRECTIONS:
+            dir_flow = flows.get(direction, {}) or {}
+            incoming_flow = dir_flow.get("incoming_flow", 0) or sum((dir_flow.get("exits") or {}).values(), 0)
+            setattr(self, f"{direction}_flow", incoming_flow)
+            total += incoming_flow
+        self.total_flow = total
+    
     @classmethod
     def from_dict(cls, data):
         """Create a TrafficFlow instance from a dictionary"""
@@ -41,7 +82,7 @@ class JunctionConfiguration(Base):
     name = Column(String(100), unique=True, nullable=False)
     
     # Foreign key relationship to traffic flow
-    traffic_flow_id = Column(Integer, ForeignKey('traffic_flows.id'), nullable=False)
+    traffic_flow_id = Column(Integer, ForeignKey('traffic_flows.id'), nullable=False, index=True)
     traffic_flow = relationship("TrafficFlow", back_populates="junctions")
     
     # Junction configuration data as JSON
@@ -50,6 +91,19 @@ class JunctionConfiguration(Base):
     # Metrics data as JSON
     metrics_data = Column(JSON, nullable=True)
     
+    # Summary columns derived from junction_data on every write
+    total_lanes = Column(Integer, index=True)
+    has_left_turn_lane = Column(Boolean, index=True)
+    has_bus_lane = Column(Boolean, index=True)
+    has_cycle_lane = Column(Boolean, index=True)
+    has_pedestrian_crossing = Column(Boolean, index=True)
+    
+    # Efficiency score of the most recent unseeded, default-length simulation of this junction
+    efficiency_score = Column(Float, index=True)
+    
+    # Past simulation runs, removed with the junction
+    simulation_runs = relationship("SimulationRun", back_populates="junction", cascade="all, delete-orphan")
+    
     def to_dict(self):
         """Convert JunctionConfiguration object to a dictionary representation"""
         result = {
@@ -64,6 +118,23 @@ class JunctionConfiguration(Base):
             
         return result
     
+    def refresh_summary(self):
+        """Recompute lane totals and feature flags from junction_data"""
+        junction_data = self.junction_data or {}
+        self.total_lanes = 0
+        self.has_left_turn_lane = self.has_bus_lane = self.has_cycle_lane = self.has_pedestrian_crossing = False
+        
+        for direction in DIRECTIONS:
+            dir_data = junction_data.get(direction, {}) or {}
+            self.total_lanes += dir_data.get("num_lanes", 0) or 0
+            self.has_left_turn_lane = self.has_left_turn_lane or bool(dir_data.get("enable_left_turn_lane", False))
+            if dir_data.get("enable_bus_cycle_lane", False):
+                if dir_data.get("bus_cycle_lane_type", "") == "cycle":
+                    self.has_cycle_lane = True
+                else:
+                    self.has_bus_lane = True
+            self.has_pedestrian_crossing = self.has_pedestrian_crossing or bool(dir_data.get("pedestrian_crossing_enabled", False))
+    
     @classmethod
     def from_dict(cls, data, traffic_flow_id):
         """Create a JunctionConfiguration instance from a dictionary and traffic flow ID"""
@@ -88,15 +159,186 @@ class JunctionConfiguration(Base):
         )
 
 
+class SimulationCacheEntry(Base):
+    __tablename__ = 'simulation_cache'
+    
+    # SHA-256 of the junction phases, traffic flow, engine version and run options
+    config_hash = Column(String(64), primary_key=True)
+    
+    # Names the entry is invalidated by when either configuration is written
+    junction_name = Column(String(100), nullable=False, index=True)
+    traffic_flow_name = Column(String(100), nullable=False, index=True)
+    
+    engine_version = Column(String(20), nullable=False)
+    results = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class SimulationRun(Base):
+    __tablename__ = 'simulation_runs'
+    __table_args__ = (
+        # Listing a junction's history newest first is one index range scan
+        Index('ix_simulation_runs_junction_created', 'junction_id', 'created_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    junction_id = Column(Integer, ForeignKey('junction_configurations.id'), nullable=False)
+    junction = relationship("JunctionConfiguration", back_populates="simulation_runs")
+    
+    # Names at the time of the run, and the hash its cached results are stored under
+    junction_name = Column(String(100), nullable=False)
+    traffic_flow_name = Column(String(100), nullable=False)
+    config_hash = Column(String(64), nullable=False, index=True)
+    engine_version = Column(String(20), nullable=False)
+    
+    duration = Column(Integer, nullable=False)
+    seed = Column(Integer, nullable=True)
+    replications = Column(Integer, nullable=False, default=1)
+    
+    # Aggregates, so history can be listed and compared without reading the series
+    efficiency_score = Column(Float, nullable=True)
+    sustainability_score = Column(Float, nullable=True)
+    average_wait_time = Column(Float, nullable=True)
+    max_queue_length = Column(Integer, nullable=True)
+    results = Column(JSON, nullable=False)
+    
+    # Per-interval snapshots packed by time_series.encoding_series, loaded only when asked for
+    interval = Column(Integer, nullable=True)
+    series = deferred(Column(LargeBinary, nullable=True))
+    
+    created_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
+    
+    def to_dict(self):
+        """Convert SimulationRun object to a dictionary representation, without its series"""
+        return {
+            "id": self.id,
+            "junction_id": self.junction_id,
+            "junction_name": self.junction_name,
+            "traffic_flow_name": self.traffic_flow_name,
+            "config_hash": self.config_hash,
+            "engine_version": self.engine_version,
+            "duration": self.duration,
+            "seed": self.seed,
+            "replications": self.replications,
+            "efficiency_score": self.efficiency_score,
+            "sustainability_score": self.sustainability_score,
+            "average_wait_time": self.average_wait_time,
+            "max_queue_length": self.max_queue_length,
+            "results": self.results,
+            "interval": self.interval,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class SimulationJob(Base):
+    __tablename__ = 'simulation_jobs'
+    
+    id = Column(String(32), primary_key=True)
+    junction_id = Column(String(100), nullable=False)
+    
+    # One of "simulate", "replications" or "optimize"
+    kind = Column(String(20), nullable=False)
+    options = Column(JSON, nullable=False)
+    
+    # queued -> running -> succeeded / failed / cancelled
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    
+    # Process that owns the job, so a restart can tell orphaned jobs apart
+    worker_pid = Column(Integer, nullable=True)
+    # host:pid:start time, as a PID alone can be reused by a process after a restart
+    worker_token = Column(String(200), nullable=True)
+    
+    results = Column(JSON, nullable=True)
+    error = Column(String(500), nullable=True)
+    
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def to_dict(self):
+        """Convert SimulationJob object to a dictionary representation"""
+        return {
+            "id": self.id,
+            "junction_id": self.junction_id,
+            "kind": self.kind,
+            "options": self.options,
+            "status": self.status,
+            "progress": round(self.progress or 0.0, 3),
+            "results": self.results,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+    
+    # One row per applied migration in backend/migrations.py
+    name = Column(String(100), primary_key=True)
+    # SHA-256 of the migration's source when it was applied
+    checksum = Column(String(64), nullable=False)
+    applied_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+# Keep the summary columns in step with the JSON they are derived from
+@event.listens_for(TrafficFlow, "before_insert")
+@event.listens_for(TrafficFlow, "before_update")
+@event.listens_for(JunctionConfiguration, "before_insert")
+@event.listens_for(JunctionConfiguration, "before_update")
+def _refreshing_summary_columns(mapper, connection, target):
+    target.refresh_summary()
+
+
 # Database connection and session management
-def init_db(db_url='sqlite:///junction_sim.db'):
-    """Initialize the database connection and create tables"""
-    engine = create_engine(db_url)
-    Base.metadata.create_all(engine)
-    return engine
+def init_db(db_url=DATABASE_URL):
+    """Create a pooled database engine; tables are created by the migrations in backend/migrations.py"""
+    connect_args = {}
+    if db_url.startswith("sqlite"):
+        # Pooled connections are checked out by whichever request thread needs one
+        connect_args["check_same_thread"] = False
+    
+    return create_engine(
+        db_url,
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=not db_url.startswith("sqlite"),
+        connect_args=connect_args
+    )
+
+
+def get_engine():
+    """
+    The shared engine, created and bound to the session factory on first use.
+    
+    Nothing touches the database at import time, so importing the app stays
+    cheap; pending migrations run once here unless RUN_MIGRATIONS_ON_STARTUP
+    is off.
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+    
+    with _engine_lock:
+        if _engine is None:
+            engine = init_db()
+            if RUN_MIGRATIONS_ON_STARTUP:
+                from ..migrations import run_migrations
+                run_migrations(engine)
+            SessionFactory.configure(bind=engine)
+            _engine = engine
+    return _engine
 
 
-def get_session(engine):
-    """Create a new session"""
-    Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+def get_session(engine=None):
+    """Create a new session from the shared factory"""
+    if engine is None:
+        get_engine()
+        return SessionFactory()
+    return SessionFactory(bind=engine)
@@ -1,19 +1,24 @@
+import os
+
 from .junction_config import JunctionConfiguration 
 
+# Most junction configurations that can be stored for one traffic flow
+MAX_JUNCTIONS_PER_TRAFFIC_FLOW = int(os.environ.get("MAX_JUNCTIONS_PER_TRAFFIC_FLOW", 10))
+
 class JunctionConfigurationInput:
     def __init__(self, name: str, junctionConfig: JunctionConfiguration, 
-    existing_junction_config_names: set, existing_traffic_config_names: set):
+    name_taken: bool = False, junction_count: int = 0):
         self.name = name  
         self.junctionConfig = junctionConfig  
         self.errors: list[str] = []
-        self.existing_junction_config_names = existing_junction_config_names
-        self.existing_traffic_config_names = existing_traffic_config_names
+        self.name_taken = name_taken  # whether another stored junction has this name
+        self.junction_count = junction_count  # junctions already stored for its traffic flow
 
     def validating_name(self):
         """Validate junction name is a non-empty string and is unique (doesn't already exist)"""
         if not self.name or not isinstance(self.name, str):
             self.errors.append("Junction configuration name must be a non-empty string.")
-        if self.name in self.existing_junction_config_names:
+        if self.name_taken:
             self.errors.append(f"Junction configuration name '{self.name}' already exists.")
 
     def validating_lanes(self):
@@ -77,15 +82,10 @@ class JunctionConfigurationInput:
             self.errors.append("Traffic priorities must contain exactly one of each: 0, 1, 2, 3, and 4.")
 
     def validating_maximum_junctions(self):
-        """Validate that a maximum of 10 junctions per traffic flow is not exceeded."""
-        count = sum(
-         1 for junction in self.existing_junction_config_names.values()
-         if junction.get('traffic_flow_name') == self.junctionConfig.traffic_flow_name
-        )
-
-        if count >= 10:
+        """Validate that the maximum number of junctions per traffic flow (10 by default) is not exceeded."""
+        if self.junction_count >= MAX_JUNCTIONS_PER_TRAFFIC_FLOW:
             self.errors.append(
-                f"Traffic flow configuration '{self.junctionConfig.traffic_flow_name}' has already reached the maximum of 10 junction configurations."
+                f"Traffic flow configuration '{self.junctionConfig.traffic_flow_name}' has already reached the maximum of {MAX_JUNCTIONS_PER_TRAFFIC_FLOW} junction configurations."
             )
 
     def validate(self) -> bool:
@@ -0,0 +1,119 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class ListQueryInput:
+    def __init__(self, args: dict, range_fields: tuple, flag_fields: tuple, sort_fields: tuple, output_fields: tuple = ()):
+        self.args = args  # query string arguments
+        self.range_fields = range_fields  # filterable with min_<field> and max_<field>
+        self.flag_fields = flag_fields  # filterable with <field>=true/false
+        self.sort_fields = sort_fields  # the first is the default sort
+        self.output_fields = output_fields  # selectable with fields=<field>,<field>
+        self.errors: list[str] = []
+        self.filters = {}  # {(field, "min" | "max" | "eq"): value}
+        self.sort = None  # (field, descending)
+        self.limit = DEFAULT_PAGE_SIZE
+        self.after = None  # (sort value, id) of the last row of the previous page
+        self.fields = None  # None selects every output field
+
+    def validating_range_filters(self):
+        """Validate min_<field> and max_<field> bounds, which must be numbers."""
+        for field in self.range_fields:
+            for bound in ("min", "max"):
+                value = self.args.get(f"{bound}_{field}")
+                if value is None:
+                    continue
+                try:
+                    self.filters[(field, bound)] = float(value)
+                except ValueError:
+                    self.errors.append(f"Filter '{bound}_{field}' must be a number.")
+
+    def validating_flag_filters(self):
+        """Validate feature flag filters, which must be true or false."""
+        for field in self.flag_fields:
+            value = self.args.get(field)
+            if value is None:
+                continue
+            if value.lower() in ("true", "1"):
+                self.filters[(field, "eq")] = True
+            elif value.lower() in ("false", "0"):
+                self.filters[(field, "eq")] = False
+            else:
+                self.errors.append(f"Filter '{field}' must be true or false.")
+
+    def validating_sort(self):
+        """Validate the sort field, optionally prefixed with '-' for descending order."""
+        sort = self.args.get("sort", self.sort_fields[0])
+        field = sort[1:] if sort.startswith("-") else sort
+        if field not in self.sort_fields:
+            self.errors.append(f"Sort must be one of {', '.join(self.sort_fields)}, optionally prefixed with '-' for descending order.")
+        else:
+            self.sort = (field, sort.startswith("-"))
+
+    def validating_limit(self):
+        """Validate the page size, which must be between 1 and MAX_PAGE_SIZE."""
+        limit = self.args.get("limit")
+        if limit is None:
+            return
+        try:
+            self.limit = int(limit)
+        except ValueError:
+            self.errors.append("Limit must be a whole number.")
+            return
+        if not 1 <= self.limit <= MAX_PAGE_SIZE:
+            self.errors.append(f"Limit must be between 1 and {MAX_PAGE_SIZE}.")
+
+    def validating_cursor(self):
+        """Validate the cursor returned with the previous page, which only applies to the same sort."""
+        cursor = self.args.get("cursor")
+        if cursor is None or self.sort is None:
+            return
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            sort, (value, last_id) = decoded["sort"], decoded["after"]
+        except (ValueError, TypeError, KeyError):
+            self.errors.append("Cursor is invalid.")
+            return
+        if sort != list(self.sort):
+            self.errors.append("Cursor belongs to a different sort order.")
+            return
+        self.after = (value, last_id)
+
+    def validating_fields(self):
+        """Validate the selected output fields."""
+        fields = self.args.get("fields")
+        if fields is None or not self.output_fields:
+            return
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in self.fields if field not in self.output_fields]
+        if unknown or not self.fields:
+            self.errors.append(f"Fields must be chosen from {', '.join(self.output_fields)}.")
+
+    def encoding_cursor(self, value, last_id) -> str:
+        """Cursor for the page after the row with this sort value and ID."""
+        payload = json.dumps({"sort": list(self.sort), "after": [value, last_id]}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    def selects(self, field: str) -> bool:
+        """Whether an output field is wanted, so storage can skip reading it."""
+        return self.fields is None or field in self.fields
+
+    def selecting_fields(self, item: dict) -> dict:
+        """Keeps only the selected output fields of one listed item."""
+        if self.fields is None:
+            return item
+        return {field: item[field] for field in self.fields}
+
+    def validate(self) -> bool:
+        """Runs all validation checks and returns True if valid."""
+        self.validating_range_filters()
+        self.validating_flag_filters()
+        self.validating_sort()
+        self.validating_limit()
+        self.validating_cursor()
+        self.validating_fields()
+
+        return len(self.errors) == 0
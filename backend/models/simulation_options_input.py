@@ -0,0 +1,80 @@
+class SimulationOptionsInput:
+    def __init__(self, kind: str, options: dict):
+        self.kind = kind  # "simulate", "replications" or "optimize"
+        self.options = options or {}
+        self.errors: list[str] = []
+
+    def validating_kind(self):
+        """Validate that the run kind is one the simulation engine supports."""
+        if self.kind not in ("simulate", "replications", "optimize"):
+            self.errors.append("Simulation kind must be one of 'simulate', 'replications' or 'optimize'.")
+
+    def validating_duration(self):
+        """Validate simulated duration in seconds; optimizer screening runs need at least 10 minutes."""
+        duration = self.options.get("duration", 3600)
+        minimum = 600 if self.kind == "optimize" else 60
+        if not isinstance(duration, int) or isinstance(duration, bool) or not (minimum <= duration <= 86400):
+            self.errors.append(f"Simulation duration must be an integer between {minimum} and 86400 seconds.")
+
+    def validating_seed(self):
+        """Validate that the random seed, if given, is an integer."""
+        seed = self.options.get("seed")
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+            self.errors.append("Simulation seed must be an integer.")
+
+    def validating_replications(self):
+        """Validate number of replications, which must be between 1 and 1000."""
+        replications = self.options.get("replications", 1)
+        if not isinstance(replications, int) or isinstance(replications, bool) or not (1 <= replications <= 1000):
+            self.errors.append("Replications must be an integer between 1 and 1000.")
+
+    def validating_mode(self):
+        """Validate estimation mode; the analytic estimate has no randomness to replicate."""
+        mode = self.options.get("mode", "simulation")
+        if mode not in ("simulation", "analytic"):
+            self.errors.append("Simulation mode must be 'simulation' or 'analytic'.")
+        elif mode == "analytic" and self.kind != "simulate":
+            self.errors.append("Analytic mode only applies to single simulation runs.")
+
+    def validating_optimizer_options(self):
+        """Validate lane counts to search (1 to 5 lanes) and how many configurations to return."""
+        lane_counts = self.options.get("lane_counts")
+        if lane_counts is not None and (
+            not isinstance(lane_counts, list) or not lane_counts
+            or not all(isinstance(lanes, int) and 1 <= lanes <= 5 for lanes in lane_counts)
+        ):
+            self.errors.append("Lane counts must be a list of integers between 1 and 5.")
+
+        top_n = self.options.get("top_n", 5)
+        if not isinstance(top_n, int) or isinstance(top_n, bool) or not (1 <= top_n <= 50):
+            self.errors.append("Number of configurations to return must be an integer between 1 and 50.")
+
+    def validate(self) -> bool:
+        """Runs the validation methods for this kind and returns True if valid."""
+        self.validating_kind()
+        self.validating_duration()
+        self.validating_seed()
+        self.validating_mode()
+
+        if self.kind == "optimize":
+            self.validating_optimizer_options()
+        else:
+            self.validating_replications()
+
+        return len(self.errors) == 0
+
+    def cleaned_options(self) -> dict:
+        """Returns only the options that apply to this kind, with defaults filled in."""
+        cleaned = {
+            "duration": self.options.get("duration", 3600),
+            "seed": self.options.get("seed")
+        }
+        if self.kind == "optimize":
+            cleaned["lane_counts"] = self.options.get("lane_counts")
+            cleaned["top_n"] = self.options.get("top_n", 5)
+            if cleaned["seed"] is None:
+                cleaned["seed"] = 0  # candidates must all see the same arrivals
+        else:
+            cleaned["replications"] = self.options.get("replications", 1)
+            cleaned["mode"] = self.options.get("mode", "simulation")
+        return cleaned
@@ -1,9 +1,11 @@
 class TrafficFlow:
-    def __init__(self, name: str, flow_rates: dict[str, int], exit_distributions: dict[str, dict[str, int]]):
+    def __init__(self, name: str, flow_rates: dict[str, int], exit_distributions: dict[str, dict[str, int]],
+                 demand_profiles: dict[str, list[dict]] = None):
         
         self.name = name  # Name of the traffic flow
         self.incoming_flows = flow_rates  # Stores the incoming flow for each direction
         self.exit_flows = exit_distributions  # Stores the exit flows
+        self.demand_profiles = demand_profiles or {}  # Optional time-of-day segments for each direction
 
     def to_dict(self) -> dict:
         '''
@@ -17,6 +19,10 @@ class TrafficFlow:
                 "incoming_flow": self.incoming_flows.get(direction, 0),
                 "exits": self.exit_flows.get(direction, {})
             }
+            
+            # Each segment is {"duration": seconds, "incoming_flow": vph}, run back to back
+            if self.demand_profiles.get(direction):
+                flows[direction]["profile"] = self.demand_profiles[direction]
         
         return {
             "name": self.name,
@@ -1,12 +1,18 @@
+import os
+
 from ..models.traffic_flow import TrafficFlow
 from ..storage import saving_traffic_flow, loading_traffic_flows
 
+# Most traffic flow configurations that can be stored
+MAX_TRAFFIC_FLOW_CONFIGURATIONS = int(os.environ.get("MAX_TRAFFIC_FLOW_CONFIGURATIONS", 10))
+
 class TrafficFlowInput:
-    def __init__(self, name: str, flows: dict, existing_traffic_config_names: set):
+    def __init__(self, name: str, flows: dict, name_taken: bool = False, configuration_count: int = 0):
         self.name = name  
         self.flows = flows # input data from frontend in new format
         self.errors: list[str] = []
-        self.existing_traffic_config_names = existing_traffic_config_names #tracks the existing names
+        self.name_taken = name_taken # whether another stored configuration has this name
+        self.configuration_count = configuration_count # number of configurations already stored
 
     def validating_flow_rates(self) -> bool:
         # Validate incoming traffic flow rate to be integers between 0 and 2000
@@ -47,20 +53,49 @@ class TrafficFlowInput:
 
         return len(self.errors) == 0
 
+    def validating_demand_profiles(self) -> bool:
+        # Validate optional demand profiles: segments of 60 seconds to 24 hours at 0-2000 vph, covering at most a day
+        for direction in ['northbound', 'southbound', 'eastbound', 'westbound']:
+            profile = self.flows.get(direction, {}).get('profile')
+            if profile is None:
+                continue
+
+            if not isinstance(profile, list) or not (1 <= len(profile) <= 1440):
+                self.errors.append(f"Demand profile for {direction} must be a list of between 1 and 1440 segments.")
+                continue
+
+            total_duration = 0
+            for segment in profile:
+                duration = segment.get('duration') if isinstance(segment, dict) else None
+                incoming_flow = segment.get('incoming_flow') if isinstance(segment, dict) else None
+
+                if not isinstance(duration, int) or not (60 <= duration <= 86400):
+                    self.errors.append(f"Demand profile segments for {direction} must last a whole number of seconds, between 60 and 86400.")
+                    break
+                if not isinstance(incoming_flow, int) or not (0 <= incoming_flow <= 2000):
+                    self.errors.append(f"Demand profile flows for {direction} must be non-negative whole numbers in vph, between 0 and 2000.")
+                    break
+                total_duration += duration
+            else:
+                if total_duration > 86400:
+                    self.errors.append(f"Demand profile for {direction} must not cover more than 24 hours.")
+
+        return len(self.errors) == 0
+
     def validating_name(self) -> bool:
         # Validate that name for traffic flow configuration is a non-empty string and is unique (doesn't already exist) 
         if not self.name or not isinstance(self.name, str):
             self.errors.append("Traffic configuration name must be a non-empty string.")
 
-        if self.name in self.existing_traffic_config_names:
+        if self.name_taken:
             self.errors.append(f"Traffic configuration name '{self.name}' already exists.")
 
         return len(self.errors) == 0
 
     def validating_max_configurations(self) -> bool:
-        # Validate that the number of existing traffic configurations is <= 9 (maximum is 10)
-        if len(self.existing_traffic_config_names) >= 10:
-            self.errors.append(f"The maximum number of traffic configurations (10) are already being stored.")
+        # Validate that there is room for another traffic configuration (maximum is 10 by default)
+        if self.configuration_count >= MAX_TRAFFIC_FLOW_CONFIGURATIONS:
+            self.errors.append(f"The maximum number of traffic configurations ({MAX_TRAFFIC_FLOW_CONFIGURATIONS}) are already being stored.")
             return False
         return True
 
@@ -70,6 +105,7 @@ class TrafficFlowInput:
         """
         self.validating_flow_rates()
         self.validating_exit_distributions()
+        self.validating_demand_profiles()
         self.validating_name()
         self.validating_max_configurations()
 
@@ -87,18 +123,22 @@ class TrafficFlowInput:
         # Extract flow rates and exit distributions from the new format
         flow_rates = {}
         exit_distributions = {}
+        demand_profiles = {}
         
         for direction in ['northbound', 'southbound', 'eastbound', 'westbound']:
             if direction in self.flows:
                 flow_data = self.flows[direction]
                 flow_rates[direction] = flow_data.get('incoming_flow', 0)
                 exit_distributions[direction] = flow_data.get('exits', {})
+                if flow_data.get('profile'):
+                    demand_profiles[direction] = flow_data['profile']
 
         #Constructing TrafficFlow object with extracted data
         traffic_flow = TrafficFlow(
             name=self.name,
             flow_rates=flow_rates,
-            exit_distributions=exit_distributions
+            exit_distributions=exit_distributions,
+            demand_profiles=demand_profiles
         )
 
         return saving_traffic_flow(traffic_flow)
\ No newline at end of file
@@ -0,0 +1,214 @@
+import itertools
+import os
+
+from .simulation import DIRECTIONS, PHASES, simulate
+from .estimator import estimate
+from .replications import MAX_WORKERS, mapping_in_pool
+
+# Upper bound on permutations x lane combinations evaluated by one request
+MAX_CANDIDATES = 20000
+
+# Larger searches are cut down to this many candidates with the archived formulas before estimating
+PRESCREEN_KEEP = int(os.environ.get("OPTIMIZER_PRESCREEN_KEEP", 2000))
+
+
+def build_candidates(junction_data: dict, lane_counts: list = None) -> list:
+    """
+    Lists every valid priority assignment, optionally crossed with lane counts.
+
+    Each candidate is (priorities, lanes) where priorities maps all five phases
+    to a distinct level 0-4, as JunctionConfigurationInput requires.
+    """
+    if lane_counts:
+        lane_options = list(itertools.product(sorted(set(lane_counts)), repeat=len(DIRECTIONS)))
+    else:
+        lane_options = [tuple(junction_data.get(direction, {}).get("num_lanes", 1) for direction in DIRECTIONS)]
+
+    candidates = []
+    for permutation in itertools.permutations(range(len(PHASES))):
+        priorities = dict(zip(PHASES, permutation))
+        for lanes in lane_options:
+            candidates.append((priorities, dict(zip(DIRECTIONS, lanes))))
+    return candidates
+
+
+def apply_candidate(junction_data: dict, priorities: dict, lanes: dict) -> dict:
+    """Returns a copy of the junction data with the candidate's priorities and lane counts."""
+    candidate = {}
+    for direction in DIRECTIONS:
+        candidate[direction] = {
+            **junction_data.get(direction, {}),
+            "num_lanes": lanes[direction],
+            "traffic_priority": priorities[direction]
+        }
+    candidate["pedestrian"] = {"traffic_priority": priorities["pedestrian"]}
+    return candidate
+
+
+def _evaluate_chunk(junction_data, flow_data, duration, seed, candidates):
+    """Simulates each candidate with the same seed; executed inside a worker process."""
+    evaluated = []
+    for priorities, lanes in candidates:
+        results = simulate(apply_candidate(junction_data, priorities, lanes), flow_data, duration=duration, seed=seed)
+        evaluated.append({
+            "priorities": priorities,
+            "lanes": lanes,
+            "efficiency_score": results.efficiencyScore,
+            "sustainability_score": results.sustainabilityScore,
+            "results": results.to_dict()
+        })
+    return evaluated
+
+
+def prescreening_candidates(junction_data: dict, flow_data: dict, candidates: list, keep: int) -> list:
+    """
+    Keeps up to `keep` of the most promising candidates by the archived formulas, scoring them all in one batch.
+
+    More lanes always shorten the archived wait and queue estimates, so the
+    best candidates are taken within each total lane count rather than
+    overall, leaving the estimator the same lanes/efficiency trade-off.
+    """
+    # Only large searches need numpy, so it isn't loaded at startup
+    import numpy as np
+    from .calculations import JunctionBatch, calculator
+
+    batch = JunctionBatch.from_configs(
+        (apply_candidate(junction_data, priorities, lanes), flow_data) for priorities, lanes in candidates
+    )
+    efficiency = calculator.calculate_junction_metrics(batch)["efficiency_score"]
+    total_lanes = batch.num_lanes.sum(axis=1)
+
+    groups = np.unique(total_lanes)
+    per_group = max(1, keep // len(groups))
+    kept = []
+    for total in groups:
+        indices = np.flatnonzero(total_lanes == total)
+        kept.extend(indices[np.argsort(-efficiency[indices], kind="stable")[:per_group]])
+    return [candidates[i] for i in sorted(kept)]
+
+
+def estimate_candidates(junction_data: dict, flow_data: dict, candidates: list, duration: int) -> list:
+    """Scores each candidate with the analytic estimator, in the same form as simulated candidates."""
+    estimated = []
+    for priorities, lanes in candidates:
+        results = estimate(apply_candidate(junction_data, priorities, lanes), flow_data, duration=duration)
+        estimated.append({
+            "priorities": priorities,
+            "lanes": lanes,
+            "efficiency_score": results["efficiency_score"],
+            "sustainability_score": results["sustainability_score"],
+            "results": results
+        })
+    return estimated
+
+
+def evaluate_candidates(junction_data: dict, flow_data: dict, candidates: list,
+                        duration: int, seed: int, progress=None) -> list:
+    """
+    Fans candidate simulations out over the worker pool in a few chunks per worker.
+
+    `progress`, if given, is called with the completed fraction after each chunk.
+    """
+    if MAX_WORKERS == 1 or len(candidates) < 2:
+        evaluated = []
+        step = max(1, len(candidates) // 20)
+        for start in range(0, len(candidates), step):
+            evaluated.extend(_evaluate_chunk(junction_data, flow_data, duration, seed, candidates[start:start + step]))
+            if progress:
+                progress(len(evaluated) / len(candidates))
+        return evaluated
+
+    return mapping_in_pool(_evaluate_chunk, candidates, junction_data, flow_data, duration, seed, progress=progress)
+
+
+def _objectives(candidate: dict) -> tuple:
+    """Objectives to maximise: efficiency, sustainability and (negated) total lanes."""
+    return (candidate["efficiency_score"], candidate["sustainability_score"], -sum(candidate["lanes"].values()))
+
+
+def _pareto_front(candidates: list) -> list:
+    """
+    Returns the candidates no other candidate dominates.
+
+    Only a handful of distinct (sustainability, lanes) pairs exist, so each
+    candidate is compared against the best efficiency within every pair
+    rather than against every other candidate.
+    """
+    best = {}
+    for candidate in candidates:
+        efficiency, sustainability, lanes = _objectives(candidate)
+        best[(sustainability, lanes)] = max(best.get((sustainability, lanes), efficiency), efficiency)
+
+    front = []
+    for candidate in candidates:
+        own = _objectives(candidate)
+        dominated = any(
+            efficiency >= own[0] and sustainability >= own[1] and lanes >= own[2]
+            and (efficiency, sustainability, lanes) != own
+            for (sustainability, lanes), efficiency in best.items()
+        )
+        if not dominated:
+            front.append(candidate)
+    return front
+
+
+def prune_dominated(evaluated: list, keep: int) -> list:
+    """
+    Keeps whole Pareto fronts (efficiency, sustainability, fewest lanes) until at
+    least `keep` candidates survive, dropping everything dominated beyond that.
+    """
+    remaining = list(evaluated)
+    survivors = []
+    while remaining and len(survivors) < keep:
+        front = _pareto_front(remaining)
+        front_ids = {id(c) for c in front}
+        survivors.extend(front)
+        remaining = [c for c in remaining if id(c) not in front_ids]
+    return survivors
+
+
+def optimise_junction(junction_data: dict, flow_data: dict, lane_counts: list = None,
+                      top_n: int = 5, duration: int = 3600, seed: int = 0, progress=None) -> list:
+    """
+    Searches every priority permutation (and lane combination) for the best configurations.
+
+    Searches over PRESCREEN_KEEP candidates are first narrowed with the
+    vectorised archived formulas. Every remaining candidate is scored
+    analytically, which takes microseconds, and only the leading Pareto
+    fronts are simulated. A short screening run of those prunes dominated
+    ones again, then the survivors are re-run for the full duration. All
+    candidates share a seed so they see the same arrivals and differ only
+    by their configuration.
+    """
+    candidates = build_candidates(junction_data, lane_counts)
+    if len(candidates) > MAX_CANDIDATES:
+        raise ValueError(f"Search space of {len(candidates)} candidates exceeds the limit of {MAX_CANDIDATES}.")
+
+    if len(candidates) > PRESCREEN_KEEP:
+        candidates = prescreening_candidates(junction_data, flow_data, candidates, PRESCREEN_KEEP)
+
+    # The estimate can't separate permutations whose differences are within
+    # simulation noise, so keep a wide margin of fronts for the simulator
+    estimated = estimate_candidates(junction_data, flow_data, candidates, duration)
+    worth_simulating = prune_dominated(estimated, keep=max(top_n * 20, 100))
+    if progress:
+        progress(0.05)
+
+    screen_duration = max(600, duration // 4)
+    screened = evaluate_candidates(
+        junction_data, flow_data,
+        [(c["priorities"], c["lanes"]) for c in worth_simulating],
+        screen_duration, seed,
+        progress=(lambda done: progress(0.05 + 0.75 * done)) if progress else None
+    )
+    survivors = prune_dominated(screened, keep=max(top_n * 4, 20))
+
+    final = evaluate_candidates(
+        junction_data, flow_data,
+        [(c["priorities"], c["lanes"]) for c in survivors],
+        duration, seed,
+        progress=(lambda done: progress(0.8 + 0.2 * done)) if progress else None
+    )
+    final.sort(key=lambda c: (-c["efficiency_score"], -c["sustainability_score"], sum(c["lanes"].values())))
+
+    return final[:top_n]
@@ -0,0 +1,15 @@
+import os
+
+
+def process_alive(pid) -> bool:
+    """Checks whether a process with this ID is still running on this machine."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It exists but belongs to another user
+        return True
+    return True
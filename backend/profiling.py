@@ -0,0 +1,86 @@
+import cProfile
+import hmac
+import os
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# Profiling is off unless a token is set; requests opt in with X-Profile: <token> or ?profile=<token>
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+# tracemalloc traces the whole process, so only one request at a time can take a memory snapshot
+_memory_lock = threading.Lock()
+
+
+def profiling_requested(headers, args) -> bool:
+    """Whether a request carries the profiling token, in its X-Profile header or profile argument."""
+    if not PROFILING_TOKEN:
+        return False
+    token = headers.get("X-Profile") or args.get("profile") or ""
+    return hmac.compare_digest(token.encode("utf-8"), PROFILING_TOKEN.encode("utf-8"))
+
+
+class RequestProfile:
+    """
+    cProfile of one request, optionally with a tracemalloc snapshot, saved to PROFILE_DIR.
+
+    The profile is written as <time>-<method>-<route>-<pid>.prof for pstats
+    or snakeviz, with the memory snapshot beside it as .tracemalloc. Only
+    the thread handling the request is profiled.
+    """
+
+    def __init__(self, method: str, route: str, memory: bool = False):
+        self.name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{method}-{_slug(route)}-{os.getpid()}"
+        self.memory = memory
+        self.profiler = cProfile.Profile()
+        self.started = None
+        self.cpu_started = None
+
+    def start(self):
+        if self.memory:
+            # Skipped rather than waited for while another request holds it
+            self.memory = _memory_lock.acquire(blocking=False)
+            if self.memory:
+                tracemalloc.start()
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Another profiler is active in this thread
+            self.profiler = None
+
+    def stop(self) -> str:
+        """Stops profiling, saves the results and returns them as a Server-Timing header value."""
+        if self.profiler is not None:
+            self.profiler.disable()
+        total = (time.perf_counter() - self.started) * 1000
+        cpu = (time.thread_time() - self.cpu_started) * 1000
+        timings = [f"total;dur={total:.1f}", f"cpu;dur={cpu:.1f}"]
+
+        snapshot = None
+        if self.memory:
+            try:
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                timings.append(f'memory;desc="peak {peak / 1024:.0f} KiB"')
+            finally:
+                tracemalloc.stop()
+                _memory_lock.release()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, self.name)
+        if self.profiler is not None:
+            self.profiler.dump_stats(path + ".prof")
+        if snapshot is not None:
+            snapshot.dump(path + ".tracemalloc")
+
+        timings.append(f'profile;desc="{self.name}"')
+        return ", ".join(timings)
+
+
+def _slug(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
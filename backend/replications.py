@@ -0,0 +1,131 @@
+import atexit
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .simulation import DIRECTIONS, simulate
+
+# Two-sided 95% Student t critical values by degrees of freedom
+T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+    9: 2.262, 10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086, 21: 2.080, 22: 2.074,
+    23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045,
+    30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980
+}
+
+DIRECTION_METRICS = ['average_wait_times', 'max_wait_times', 'max_queue_lengths']
+SCALAR_METRICS = ['efficiency_score', 'sustainability_score']
+
+MAX_WORKERS = int(os.environ.get("SIMULATION_WORKERS", 0)) or os.cpu_count() or 1
+
+_pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Returns the shared simulation worker pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        atexit.register(_pool.shutdown, wait=False)
+    return _pool
+
+
+def mapping_in_pool(function, items: list, *args, progress=None) -> list:
+    """
+    Calls function(*args, chunk) in the worker pool for a few chunks of items per worker.
+
+    `function` returns one result per item of its chunk, and the results
+    come back in the order of `items`. Chunks are sent strided so each has
+    a similar mix of work. `progress`, if given, is called with the
+    completed fraction after each chunk. If a chunk raises, or the caller
+    gives up waiting, chunks not yet started are cancelled.
+    """
+    chunk_count = min(MAX_WORKERS * 4, len(items))
+    pool = get_process_pool()
+    futures = {pool.submit(function, *args, items[i::chunk_count]): i for i in range(chunk_count)}
+
+    results = [None] * len(items)
+    completed = 0
+    try:
+        for future in as_completed(futures):
+            chunk_results = future.result()
+            results[futures[future]::chunk_count] = chunk_results
+            completed += len(chunk_results)
+            if progress:
+                progress(completed / len(items))
+    except BaseException:
+        # Don't leave queued chunks running for a caller that has given up
+        for future in futures:
+            future.cancel()
+        raise
+
+    return results
+
+
+def _run_chunk(junction_data, flow_data, duration, seeds):
+    """Runs one replication per seed; executed inside a worker process."""
+    return [simulate(junction_data, flow_data, duration=duration, seed=seed).to_dict() for seed in seeds]
+
+
+def t_critical(degrees_of_freedom: int) -> float:
+    """Looks up the 95% t critical value, using the next tabulated row below when not listed."""
+    if degrees_of_freedom < 1:
+        return float("nan")
+    if degrees_of_freedom > 120:
+        return 1.960
+    return T_CRITICAL_95[max(df for df in T_CRITICAL_95 if df <= degrees_of_freedom)]
+
+
+def summarise_samples(samples: list) -> dict:
+    """Mean, sample standard deviation and 95% confidence interval of a list of values."""
+    n = len(samples)
+    mean = sum(samples) / n
+    std = math.sqrt(sum((x - mean) ** 2 for x in samples) / (n - 1)) if n > 1 else 0.0
+    half_width = t_critical(n - 1) * std / math.sqrt(n) if n > 1 else 0.0
+
+    return {
+        "mean": round(mean, 2),
+        "std": round(std, 2),
+        "ci_low": round(mean - half_width, 2),
+        "ci_high": round(mean + half_width, 2)
+    }
+
+
+def summarise_replications(results: list) -> dict:
+    """Collapses per-replication SimulationResults dictionaries into per-metric statistics."""
+    summary = {}
+    for metric in DIRECTION_METRICS:
+        summary[metric] = {
+            direction: summarise_samples([result[metric][direction] for result in results])
+            for direction in DIRECTIONS
+        }
+    for metric in SCALAR_METRICS:
+        summary[metric] = summarise_samples([result[metric] for result in results])
+    return summary
+
+
+def run_replications(junction_data: dict, flow_data: dict, replications: int,
+                     duration: int = 3600, seed: int = None, progress=None) -> dict:
+    """
+    Runs independently seeded replications across the worker pool and summarises them.
+
+    Seeds are drawn from the base seed so the same request always gives the same
+    statistics. Replications are sent in a few chunks per worker to keep
+    inter-process traffic low while still reporting progress; `progress`, if
+    given, is called with the completed fraction after each chunk.
+    """
+    seed_source = random.Random(seed)
+    seeds = [seed_source.getrandbits(32) for _ in range(replications)]
+
+    if replications == 1 or MAX_WORKERS == 1:
+        results = []
+        for i, replication_seed in enumerate(seeds):
+            results.extend(_run_chunk(junction_data, flow_data, duration, [replication_seed]))
+            if progress:
+                progress((i + 1) / replications)
+        return summarise_replications(results)
+
+    results = mapping_in_pool(_run_chunk, seeds, junction_data, flow_data, duration, progress=progress)
+    return summarise_replications(results)
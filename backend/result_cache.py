@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .simulation import ENGINE_VERSION, PHASES
+
+
+def config_hash(junction_data: dict, flow_data: dict, **params) -> str:
+    """
+    Canonical SHA-256 of everything that determines a simulation's output.
+
+    Only the signal phase settings of the junction are hashed, so renaming a
+    junction or storing metrics on it does not change its hash.
+    """
+    payload = {
+        "engine": ENGINE_VERSION,
+        "junction": {phase: junction_data[phase] for phase in PHASES if phase in junction_data},
+        "flows": flow_data,
+        "params": params
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries carry tags for invalidation.
+
+    Every invalidation bumps `generation`. A reader that notes the generation
+    before going to the database and passes it to put() can't cache a value
+    that a write made stale while it was being read. Entries optionally
+    expire after `ttl` seconds.
+
+    With a `shared_generation_file`, every invalidation also replaces that
+    file, and every lookup clears this process's entries if another
+    process has replaced it since the last look, so a write in one worker
+    process reaches the caches of the others.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = None, shared_generation_file: str = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_generation_file = shared_generation_file
+        self._entries = OrderedDict()  # {key: (value, tags, expires)}
+        self._lock = threading.Lock()
+        self._shared_generation = None  # the file's (inode, mtime) at the last look
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _syncing_shared_generation(self):
+        try:
+            stat = os.stat(self.shared_generation_file)
+            shared_generation = (stat.st_ino, stat.st_mtime_ns)
+        except OSError:
+            shared_generation = None
+        with self._lock:
+            if shared_generation == self._shared_generation:
+                return
+            self._shared_generation = shared_generation
+            self.generation += 1
+            self._entries.clear()
+
+    def _bumping_shared_generation(self):
+        # Replaced rather than rewritten so the inode changes even where mtimes are coarse
+        path = f"{self.shared_generation_file}.{os.getpid()}.tmp"
+        try:
+            with open(path, "w") as file:
+                file.write(str(time.time_ns()))
+            os.replace(path, self.shared_generation_file)
+        except OSError as e:
+            print(f"Error bumping shared cache generation {self.shared_generation_file}: {e}")
+
+    def get(self, key):
+        if self.shared_generation_file:
+            self._syncing_shared_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, tags=(), generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (value, frozenset(tags), expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag) -> int:
+        """Drops every entry carrying the tag and returns how many were removed."""
+        if self.shared_generation_file:
+            self._bumping_shared_generation()
+        with self._lock:
+            self.generation += 1
+            stale = [key for key, (_, tags, _) in self._entries.items() if tag in tags]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit and miss counts and current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# In-process tier in front of the simulation_cache table
+simulation_cache = ResultCache(maxsize=int(os.environ.get("SIMULATION_CACHE_SIZE", 256)))
+
+# Read-through cache of traffic flow and junction lookups. Worker processes
+# sharing CONFIG_CACHE_GENERATION_FILE see each other's writes on their next
+# lookup; without it the TTL bounds how long another process's write can go unnoticed
+config_cache = ResultCache(
+    maxsize=int(os.environ.get("CONFIG_CACHE_SIZE", 512)),
+    ttl=float(os.environ.get("CONFIG_CACHE_TTL", 30)) or None,
+    shared_generation_file=os.environ.get("CONFIG_CACHE_GENERATION_FILE")
+)
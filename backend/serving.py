@@ -0,0 +1,32 @@
+import gc
+import importlib
+
+from .models.db_models import get_engine
+from .result_cache import simulation_cache
+from .storage import preloading_cached_simulations
+
+# Imported on first use so development startup stays fast; time series and optimizer pre-screening need them
+LAZY_MODULES = ("numpy", ".calculations")
+
+
+def warming_up():
+    """
+    Prepares a preloaded app in the serving master before workers are forked.
+
+    Runs pending migrations, fills the in-process simulation cache from the
+    database and imports LAZY_MODULES, which the app otherwise loads on first use,
+    so every worker starts with them in memory it shares copy-on-write. The
+    engine's connections are then closed, as a forked worker must not reuse
+    them, and the loaded objects are frozen out of the garbage collector so
+    collections in the workers don't copy their pages.
+    """
+    engine = get_engine()
+    preloaded = preloading_cached_simulations(simulation_cache.maxsize)
+
+    for module in LAZY_MODULES:
+        importlib.import_module(module, __package__)
+
+    engine.dispose()
+    gc.collect()
+    gc.freeze()
+    return preloaded
@@ -0,0 +1,472 @@
+import heapq
+import math
+import random
+from bisect import bisect_right
+
+from .models.simulation_results import SimulationResults
+from .vehicle_state import VehicleRingBuffer, EXIT_INDEX, EVU_CLASSES, CAR, BUS, BICYCLE
+
+# Bumped whenever a change to the engine alters its results
+ENGINE_VERSION = "2"
+
+DIRECTIONS = ['northbound', 'southbound', 'eastbound', 'westbound']
+PHASES = DIRECTIONS + ['pedestrian']
+
+# Exit taken by a vehicle turning left from each approach
+LEFT_TURN_EXITS = {
+    'northbound': 'exit_west',
+    'southbound': 'exit_east',
+    'eastbound': 'exit_north',
+    'westbound': 'exit_south'
+}
+
+# Signal timing constants (seconds)
+CYCLE_DURATION = 120
+INTERGREEN = 4
+MIN_GREEN = 7
+STARTUP_LOST_TIME = 2
+
+# Vehicles per hour through a green light on one lane
+BASE_PROCESSING_RATE = 1800
+
+# Vehicle equivalency units, used to scale each vehicle's discharge headway
+EVU_FACTORS = {'car': 1.0, 'bus': 2.0, 'bicycle': 0.5}
+SATURATION_HEADWAY = 3600 / BASE_PROCESSING_RATE
+DISCHARGE_HEADWAYS = [SATURATION_HEADWAY * EVU_FACTORS[vehicle] for vehicle in EVU_CLASSES]
+ENV_BONUSES = {'bus_lane': 20, 'cycle_lane': 15, 'pedestrian_crossing': 10}
+
+# Event kinds, ordered so simultaneous signal changes run before vehicle moves
+# and interval snapshots see everything that happened up to their time
+GREEN_END = 0
+GREEN_START = 1
+DEPARTURE = 2
+ARRIVAL = 3
+SAMPLE = 4
+
+
+class JunctionSimulation:
+    """
+    Discrete-event simulation of a signalised four-arm junction.
+
+    Vehicles arrive on each approach as a Poisson stream, queue on the lane
+    they are assigned to and discharge at the saturation headway while their
+    approach has a green. Signal phases run in descending priority order and
+    the pedestrian phase only runs when a crossing request is waiting.
+
+    Queued vehicles live in per-lane VehicleRingBuffers and are folded into
+    running per-direction totals as they leave, so memory depends on the
+    longest queue rather than on how many vehicles pass through.
+    """
+
+    def __init__(self, junction_data: dict, flow_data: dict, duration: int = 3600, seed: int = None):
+        self.junction_data = junction_data or {}
+        self.flow_data = flow_data or {}
+        self.duration = duration
+        self.rng = random.Random(seed)
+        self.results = None
+
+        self._build_lanes()
+        self._build_phase_plan()
+
+    def _build_lanes(self):
+        """Creates the lanes and arrival streams for every approach."""
+        self.lane_direction = []
+        self.direction_lanes = []
+        self.left_turn_lane = []
+        self.signal_lanes = [[] for _ in DIRECTIONS]
+
+        # Arrival streams: (direction index, segment end times, arrival rates per second,
+        #                  exit indices, cumulative exit weights, fixed lane, EVU class)
+        self.streams = []
+
+        for d, direction in enumerate(DIRECTIONS):
+            dir_config = self.junction_data.get(direction, {})
+            dir_flow = self.flow_data.get(direction, {})
+            lanes = []
+
+            for _ in range(max(1, int(dir_config.get("num_lanes", 1) or 1))):
+                lanes.append(self._add_lane(d))
+
+            left_lane = None
+            if dir_config.get("enable_left_turn_lane", False):
+                left_lane = self._add_lane(d)
+
+            self.direction_lanes.append(lanes)
+            self.left_turn_lane.append(left_lane)
+
+            exits = dir_flow.get("exits", {}) or {}
+            incoming_flow = dir_flow.get("incoming_flow", 0) or sum(exits.values(), 0)
+            exit_names = [name for name, flow in exits.items() if flow > 0]
+            exit_indices = [EXIT_INDEX.get(name, -1) for name in exit_names]
+            cumulative = []
+            total = 0
+            for name in exit_names:
+                total += exits[name]
+                cumulative.append(total)
+
+            segment_ends, rates = demand_schedule(dir_flow.get("profile"), incoming_flow)
+            if any(rate > 0 for rate in rates):
+                self.streams.append((d, segment_ends, rates, exit_indices, cumulative, None, CAR))
+
+            # Buses and bicycles get their own lane, discharging by EVU
+            bus_flow = dir_config.get("flow_rate", 0) or 0
+            if dir_config.get("enable_bus_cycle_lane", False) and bus_flow > 0:
+                vehicle = BICYCLE if dir_config.get("bus_cycle_lane_type", "") == "cycle" else BUS
+                self.streams.append((d, [], [bus_flow / 3600], [], [], self._add_lane(d), vehicle))
+
+        self.left_turn_exit = [EXIT_INDEX[LEFT_TURN_EXITS[direction]] for direction in DIRECTIONS]
+
+    def _add_lane(self, direction_index):
+        lane = len(self.lane_direction)
+        self.lane_direction.append(direction_index)
+        self.signal_lanes[direction_index].append(lane)
+        return lane
+
+    def _build_phase_plan(self):
+        """Orders phases by priority and splits the cycle's green time between them."""
+        priorities = {
+            phase: self.junction_data.get(phase, {}).get("traffic_priority", 0) or 0
+            for phase in PHASES
+        }
+        # Highest priority first, ties keep the north/south/east/west order
+        order = sorted(range(len(PHASES)), key=lambda p: -priorities[PHASES[p]])
+
+        self.crossing_duration = 0
+        self.crossing_rate = 0.0
+        for direction in DIRECTIONS:
+            dir_config = self.junction_data.get(direction, {})
+            if dir_config.get("pedestrian_crossing_enabled", False):
+                self.crossing_duration = max(self.crossing_duration, dir_config.get("pedestrian_crossing_duration", 0) or 0)
+                self.crossing_rate = max(self.crossing_rate, (dir_config.get("pedestrian_crossing_requests_per_hour", 0) or 0) / 3600)
+
+        # Green is shared by demand per lane, weighted up by priority
+        weights = []
+        for d, direction in enumerate(DIRECTIONS):
+            demand = sum(mean_rate(stream[1], stream[2], self.duration) * 3600 for stream in self.streams if stream[0] == d)
+            lane_count = len(self.direction_lanes[d]) + (self.left_turn_lane[d] is not None)
+            weights.append(max(demand / lane_count, 1.0) * (1 + 0.2 * priorities[direction]))
+
+        available = CYCLE_DURATION - INTERGREEN * len(DIRECTIONS) - MIN_GREEN * len(DIRECTIONS)
+        total_weight = sum(weights)
+        self.green_times = [MIN_GREEN + available * w / total_weight for w in weights]
+
+        self.phase_order = [p for p in order if PHASES[p] != 'pedestrian' or self.crossing_duration > 0]
+
+    def run(self) -> SimulationResults:
+        """Runs the simulation and returns the aggregated results."""
+        for _ in self.iter_intervals():
+            pass
+        return self.results
+
+    def iter_intervals(self, interval: int = None):
+        """
+        Runs the simulation, yielding a snapshot of queues and waits every `interval` seconds.
+
+        Snapshots are produced as the event loop reaches each boundary and nothing
+        is kept once yielded, so memory stays flat however long the run. The
+        aggregated SimulationResults are left on `self.results` when the generator
+        finishes. Without an interval nothing is yielded.
+        """
+        rng = self.rng
+        events = []
+        seq = 0
+        num_lanes = len(self.lane_direction)
+        num_directions = len(DIRECTIONS)
+
+        queues = [VehicleRingBuffer() for _ in range(num_lanes)]
+        lane_busy = [False] * num_lanes
+        lane_ready = [0.0] * num_lanes
+        green = [False] * num_directions
+        green_start = [0.0] * num_directions
+
+        queue_length = [0] * num_directions
+        max_queue = [0] * num_directions
+        arrived = [0] * num_directions
+        departed = [0] * num_directions
+        served = [0] * num_directions
+        total_wait = [0.0] * num_directions
+        max_wait = [0.0] * num_directions
+
+        # Statistics for the current reporting interval
+        interval_max_queue = [0] * num_directions
+        interval_departed = [0] * num_directions
+        interval_wait = [0.0] * num_directions
+        interval_max_wait = [0.0] * num_directions
+
+        for s, stream in enumerate(self.streams):
+            heapq.heappush(events, (next_arrival(rng, 0.0, stream[1], stream[2]), ARRIVAL, seq, s))
+            seq += 1
+
+        phase_order = self.phase_order
+        phase_count = len(phase_order)
+        last_crossing = 0.0
+        if phase_count:
+            heapq.heappush(events, (0.0, GREEN_START, seq, 0))
+            seq += 1
+        if interval:
+            heapq.heappush(events, (min(interval, self.duration), SAMPLE, seq, None))
+            seq += 1
+
+        duration = self.duration
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        while events:
+            t, kind, _, data = heappop(events)
+
+            if kind == ARRIVAL:
+                if t >= duration:
+                    continue
+                d, segment_ends, rates, exit_indices, cumulative, fixed_lane, evu_class = self.streams[data]
+
+                exit_index = -1
+                if cumulative:
+                    exit_index = exit_indices[bisect_right(cumulative, rng.random() * cumulative[-1])]
+
+                if fixed_lane is not None:
+                    lane = fixed_lane
+                elif exit_index == self.left_turn_exit[d] and self.left_turn_lane[d] is not None:
+                    lane = self.left_turn_lane[d]
+                else:
+                    lane = min(self.direction_lanes[d], key=lambda l: queues[l].size)
+
+                queues[lane].push(t, exit_index, evu_class)
+                arrived[d] += 1
+                queue_length[d] += 1
+                if queue_length[d] > max_queue[d]:
+                    max_queue[d] = queue_length[d]
+                if queue_length[d] > interval_max_queue[d]:
+                    interval_max_queue[d] = queue_length[d]
+
+                if green[d] and not lane_busy[lane]:
+                    lane_busy[lane] = True
+                    heappush(events, (max(t, lane_ready[lane], green_start[d] + STARTUP_LOST_TIME), DEPARTURE, seq, lane))
+                    seq += 1
+
+                heappush(events, (next_arrival(rng, t, segment_ends, rates), ARRIVAL, seq, data))
+                seq += 1
+
+            elif kind == DEPARTURE:
+                if t >= duration:
+                    continue
+                d = self.lane_direction[data]
+                queue = queues[data]
+                if not green[d] or not queue:
+                    lane_busy[data] = False
+                    continue
+
+                arrival, _, evu_class = queue.pop()
+                wait = t - arrival
+                queue_length[d] -= 1
+                departed[d] += 1
+                served[d] += 1
+                total_wait[d] += wait
+                if wait > max_wait[d]:
+                    max_wait[d] = wait
+                interval_departed[d] += 1
+                interval_wait[d] += wait
+                if wait > interval_max_wait[d]:
+                    interval_max_wait[d] = wait
+
+                lane_ready[data] = t + DISCHARGE_HEADWAYS[evu_class]
+                heappush(events, (lane_ready[data], DEPARTURE, seq, data))
+                seq += 1
+
+            elif kind == GREEN_START:
+                if t >= duration:
+                    continue
+                phase = phase_order[data]
+                next_phase = (data + 1) % phase_count
+
+                if PHASES[phase] == 'pedestrian':
+                    # Only stop traffic if someone pressed the button since the last crossing
+                    requested = rng.random() < 1 - math.exp(-self.crossing_rate * (t - last_crossing))
+                    if requested:
+                        last_crossing = t + self.crossing_duration
+                        heappush(events, (last_crossing, GREEN_END, seq, data))
+                    else:
+                        heappush(events, (t, GREEN_START, seq, next_phase))
+                    seq += 1
+                    continue
+
+                green[phase] = True
+                green_start[phase] = t
+                for lane in self.signal_lanes[phase]:
+                    if queues[lane] and not lane_busy[lane]:
+                        lane_busy[lane] = True
+                        heappush(events, (t + STARTUP_LOST_TIME, DEPARTURE, seq, lane))
+                        seq += 1
+
+                heappush(events, (t + self.green_times[phase], GREEN_END, seq, data))
+                seq += 1
+
+            elif kind == GREEN_END:
+                phase = phase_order[data]
+                if PHASES[phase] != 'pedestrian':
+                    green[phase] = False
+                heappush(events, (t + INTERGREEN, GREEN_START, seq, (data + 1) % phase_count))
+                seq += 1
+
+            else:  # SAMPLE
+                yield {
+                    "time": round(t, 1),
+                    "queue_lengths": dict(zip(DIRECTIONS, queue_length)),
+                    "max_queue_lengths": dict(zip(DIRECTIONS, interval_max_queue)),
+                    "departures": dict(zip(DIRECTIONS, interval_departed)),
+                    "average_wait_times": {
+                        direction: round(interval_wait[d] / interval_departed[d], 1) if interval_departed[d] else 0.0
+                        for d, direction in enumerate(DIRECTIONS)
+                    },
+                    "max_wait_times": {
+                        direction: int(math.ceil(interval_max_wait[d])) for d, direction in enumerate(DIRECTIONS)
+                    }
+                }
+                interval_max_queue = list(queue_length)
+                interval_departed = [0] * num_directions
+                interval_wait = [0.0] * num_directions
+                interval_max_wait = [0.0] * num_directions
+
+                if t < duration:
+                    heappush(events, (min(t + interval, duration), SAMPLE, seq, None))
+                    seq += 1
+
+        # Vehicles still queued at the end have waited at least until the end of the run
+        for lane, queue in enumerate(queues):
+            d = self.lane_direction[lane]
+            for arrival in queue.arrivals():
+                wait = duration - arrival
+                served[d] += 1
+                total_wait[d] += wait
+                if wait > max_wait[d]:
+                    max_wait[d] = wait
+
+        average_wait_times = {}
+        max_wait_times = {}
+        max_queue_lengths = {}
+        for d, direction in enumerate(DIRECTIONS):
+            average_wait_times[direction] = round(total_wait[d] / served[d], 1) if served[d] else 0.0
+            max_wait_times[direction] = int(math.ceil(max_wait[d]))
+            max_queue_lengths[direction] = max_queue[d]
+
+        sustainability_score = calculate_sustainability_score(self.junction_data, self.flow_data)
+        throughput = sum(departed) / sum(arrived) if sum(arrived) else 1.0
+        efficiency_score = calculate_efficiency_score(average_wait_times, max_queue_lengths, sustainability_score, throughput)
+
+        self.results = SimulationResults(
+            average_wait_times=average_wait_times,
+            max_wait_times=max_wait_times,
+            max_queue_lengths=max_queue_lengths,
+            efficiency_score=efficiency_score,
+            sustainability_score=sustainability_score
+        )
+
+
+def demand_schedule(profile: list, incoming_flow: float) -> tuple:
+    """
+    Converts a direction's demand profile into piecewise-constant arrival rates.
+
+    Returns the end time of every segment but the last, which holds for the
+    rest of the run, and the arrival rate (vehicles per second) of each
+    segment. Without a profile the flat hourly incoming flow is used.
+    """
+    if not profile:
+        return [], [incoming_flow / 3600]
+
+    segment_ends = []
+    rates = []
+    elapsed = 0
+    for segment in profile:
+        elapsed += segment.get("duration", 0)
+        segment_ends.append(elapsed)
+        rates.append((segment.get("incoming_flow", 0) or 0) / 3600)
+    return segment_ends[:-1], rates
+
+
+def next_arrival(rng: random.Random, t: float, segment_ends: list, rates: list) -> float:
+    """
+    Samples the next arrival after t of a Poisson stream with piecewise-constant rate.
+
+    Exponential gaps are memoryless, so a gap that overruns its segment is
+    redrawn from the boundary at the next segment's rate.
+    """
+    i = bisect_right(segment_ends, t)
+    while True:
+        rate = rates[i]
+        last = i == len(segment_ends)
+        if rate > 0:
+            arrival = t + rng.expovariate(rate)
+            if last or arrival < segment_ends[i]:
+                return arrival
+        elif last:
+            return math.inf
+        t = segment_ends[i]
+        i += 1
+
+
+def mean_rate(segment_ends: list, rates: list, duration: float) -> float:
+    """Time-averaged arrival rate of a schedule over the first `duration` seconds."""
+    total = 0.0
+    start = 0.0
+    for end, rate in zip(segment_ends + [math.inf], rates):
+        end = min(end, duration)
+        if end > start:
+            total += rate * (end - start)
+        start = end
+    return total / duration if duration else 0.0
+
+
+def default_duration(flow_data: dict) -> int:
+    """Length of the longest demand profile (capped at a day), or one hour without profiles."""
+    longest = max(
+        (sum(segment.get("duration", 0) for segment in flow_data.get(direction, {}).get("profile") or [])
+         for direction in DIRECTIONS),
+        default=0
+    )
+    return min(longest, 86400) if longest else 3600
+
+
+def calculate_sustainability_score(junction_data: dict, flow_data: dict) -> float:
+    """Scores environmental features out of 100, penalising very high traffic volumes."""
+    score = 60
+    has_bus_lane = has_cycle_lane = has_crossing = False
+    for direction in DIRECTIONS:
+        dir_config = junction_data.get(direction, {})
+        if dir_config.get("enable_bus_cycle_lane", False):
+            if dir_config.get("bus_cycle_lane_type", "") == "cycle":
+                has_cycle_lane = True
+            else:
+                has_bus_lane = True
+        if dir_config.get("pedestrian_crossing_enabled", False):
+            has_crossing = True
+
+    if has_bus_lane:
+        score += ENV_BONUSES['bus_lane']
+    if has_cycle_lane:
+        score += ENV_BONUSES['cycle_lane']
+    if has_crossing:
+        score += ENV_BONUSES['pedestrian_crossing']
+
+    average_flow = sum(flow_data.get(direction, {}).get("incoming_flow", 0) or 0 for direction in DIRECTIONS) / len(DIRECTIONS)
+    score -= max(0, math.ceil((average_flow - 1000) / 100) * 2)
+
+    return float(min(100, max(0, score)))
+
+
+def calculate_efficiency_score(average_wait_times: dict, max_queue_lengths: dict,
+                               sustainability_score: float, throughput: float) -> float:
+    """Combines wait, queue, sustainability and served-flow components into a score out of 100."""
+    avg_wait = sum(average_wait_times.values()) / len(DIRECTIONS)
+    avg_queue = sum(max_queue_lengths.values()) / len(DIRECTIONS)
+
+    wait_score = max(0, 100 - (avg_wait / 2))
+    queue_score = max(0, 100 - (avg_queue * 2))
+
+    flow_score = 100 * min(1.0, throughput)
+
+    score = wait_score * 0.35 + queue_score * 0.25 + sustainability_score * 0.20 + flow_score * 0.20
+    return round(min(100, max(0, score)), 1)
+
+
+def simulate(junction_data: dict, flow_data: dict, duration: int = 3600, seed: int = None) -> SimulationResults:
+    """Runs a single simulation of a stored junction against its traffic flow."""
+    return JunctionSimulation(junction_data, flow_data, duration=duration, seed=seed).run()
@@ -0,0 +1,189 @@
+import os
+
+from .simulation import JunctionSimulation, default_duration
+from .estimator import estimate
+from .replications import run_replications, mapping_in_pool, MAX_WORKERS
+from .result_cache import config_hash
+from .time_series import encoding_series
+from .metrics import metrics
+from .storage import (
+    getting_cached_simulation,
+    saving_cached_simulation,
+    updating_junction_efficiency_score,
+    saving_simulation_run
+)
+
+# Seconds between the snapshots kept in a stored junction's run history
+HISTORY_INTERVAL = int(os.environ.get("SIMULATION_HISTORY_INTERVAL", 60))
+
+# Junctions one batch request may simulate
+MAX_BATCH_SIMULATIONS = int(os.environ.get("MAX_BATCH_SIMULATIONS", 20))
+
+PHASE_METRIC = "simulation_phase_duration_seconds"
+
+
+def run_cached_simulation(junction: dict, traffic_flow: dict, duration: int = 3600,
+                          seed: int = None, replications: int = 1, mode: str = "simulation",
+                          progress=None) -> dict:
+    """
+    Simulates a stored junction against its traffic flow, reusing cached results.
+
+    A single run returns SimulationResults as a dictionary; more than one
+    replication returns the per-metric summary statistics instead. The
+    analytic mode answers from queueing formulas, which is quicker than a
+    cache lookup, so its results are not cached. Every fresh run of a
+    stored junction is added to its run history, single runs with their
+    per-interval snapshots.
+    """
+    flow_data = traffic_flow.get("flows", {})
+
+    if mode == "analytic":
+        with metrics.timing(PHASE_METRIC, phase="estimate"):
+            return estimate(junction, flow_data, duration=duration)
+
+    # Identical configurations and options reuse earlier results
+    with metrics.timing(PHASE_METRIC, phase="cache_lookup"):
+        cache_key = config_hash(junction, flow_data, duration=duration, seed=seed, replications=replications)
+        simulation_results = getting_cached_simulation(cache_key)
+    if simulation_results is not None:
+        _recording_efficiency_score(junction, flow_data, duration, seed, simulation_results)
+        return simulation_results
+
+    series = None
+    if replications > 1:
+        # Summary statistics across independently seeded runs
+        with metrics.timing(PHASE_METRIC, phase="replications"):
+            simulation_results = run_replications(
+                junction_data=junction,
+                flow_data=flow_data,
+                replications=replications,
+                duration=duration,
+                seed=seed,
+                progress=progress
+            )
+    else:
+        with metrics.timing(PHASE_METRIC, phase="simulate"):
+            simulation_results, snapshots = _simulating(junction, flow_data, duration, seed, progress)
+        with metrics.timing(PHASE_METRIC, phase="encode_series"):
+            series = encoding_series(snapshots)
+
+    _saving_results(junction, traffic_flow, cache_key, duration, seed, replications, simulation_results, series)
+    return simulation_results
+
+
+def run_cached_simulations(pairs: list, duration: int = None, seed: int = None,
+                           replications: int = 1, mode: str = "simulation") -> list:
+    """
+    Simulates several stored (junction, traffic flow) pairs, returning their results in the same order.
+
+    Single runs that miss the cache are sent to the process pool together,
+    so the batch takes about as long as its slowest junction. Replications
+    already spread each junction over the pool and analytic estimates are
+    quick, so those run one after another. Without a duration each junction
+    covers its own traffic flow's demand profile.
+    """
+    durations = [duration or default_duration(traffic_flow.get("flows", {})) for _, traffic_flow in pairs]
+
+    if mode == "analytic" or replications > 1 or MAX_WORKERS == 1 or len(pairs) == 1:
+        return [
+            run_cached_simulation(junction, traffic_flow, duration=run_duration, seed=seed,
+                                  replications=replications, mode=mode)
+            for (junction, traffic_flow), run_duration in zip(pairs, durations)
+        ]
+
+    results = [None] * len(pairs)
+    cache_hits = []
+    pending = {}  # cache key -> (duration, indices of the pairs it answers)
+    for index, ((junction, traffic_flow), run_duration) in enumerate(zip(pairs, durations)):
+        with metrics.timing(PHASE_METRIC, phase="cache_lookup"):
+            cache_key = config_hash(junction, traffic_flow.get("flows", {}), duration=run_duration, seed=seed, replications=1)
+            results[index] = getting_cached_simulation(cache_key)
+        if results[index] is not None:
+            cache_hits.append(index)
+        elif cache_key in pending:
+            # Repeated junctions, or identical designs, are only simulated once
+            pending[cache_key][1].append(index)
+        else:
+            pending[cache_key] = (run_duration, [index])
+
+    keys = list(pending)
+    runs = []
+    for cache_key in keys:
+        run_duration, indices = pending[cache_key]
+        junction, traffic_flow = pairs[indices[0]]
+        runs.append((junction, traffic_flow.get("flows", {}), run_duration))
+    with metrics.timing(PHASE_METRIC, phase="simulate_batch"):
+        simulated = mapping_in_pool(_simulating_runs, runs, seed)
+
+    fresh = {}
+    for cache_key, (simulation_results, snapshots) in zip(keys, simulated):
+        with metrics.timing(PHASE_METRIC, phase="encode_series"):
+            fresh[cache_key] = (simulation_results, encoding_series(snapshots))
+
+    # Written once every simulation has finished, so the request holds no write lock while they run
+    for index in cache_hits:
+        junction, traffic_flow = pairs[index]
+        _recording_efficiency_score(junction, traffic_flow.get("flows", {}), durations[index], seed, results[index])
+    for cache_key, (run_duration, indices) in pending.items():
+        simulation_results, series = fresh[cache_key]
+        saved = set()
+        for index in indices:
+            results[index] = simulation_results
+            junction, traffic_flow = pairs[index]
+            if junction.get("id") not in saved:
+                saved.add(junction.get("id"))
+                _saving_results(junction, traffic_flow, cache_key, run_duration, seed, 1, simulation_results, series)
+
+    return results
+
+
+def _simulating(junction: dict, flow_data: dict, duration: int, seed: int, progress=None) -> tuple:
+    """
+    Runs one simulation, returning its results and interval snapshots; may run in a pool process.
+
+    `progress`, if given, is called with the simulated fraction at every
+    snapshot and may raise to abandon the run before anything is saved.
+    """
+    simulation = JunctionSimulation(junction, flow_data, duration=duration, seed=seed)
+    snapshots = []
+    for snapshot in simulation.iter_intervals(HISTORY_INTERVAL):
+        snapshots.append(snapshot)
+        if progress:
+            progress(min(snapshot["time"] / duration, 1.0))
+    return simulation.results.to_dict(), snapshots
+
+
+def _simulating_runs(seed: int, runs: list) -> list:
+    """Runs each (junction, flow data, duration) with the same seed; executed inside a worker process."""
+    return [_simulating(junction, flow_data, duration, seed) for junction, flow_data, duration in runs]
+
+
+def _saving_results(junction: dict, traffic_flow: dict, cache_key: str, duration: int, seed: int,
+                    replications: int, simulation_results: dict, series: bytes = None):
+    """Caches fresh results, records the efficiency score and adds the run to the junction's history."""
+    with metrics.timing(PHASE_METRIC, phase="save_results"):
+        saving_cached_simulation(cache_key, junction.get("name", ""), traffic_flow.get("name", ""), simulation_results)
+        _recording_efficiency_score(junction, traffic_flow.get("flows", {}), duration, seed, simulation_results)
+        if junction.get("id") is not None:
+            saving_simulation_run(
+                junction["id"], junction.get("name", ""), traffic_flow.get("name", ""), cache_key,
+                {"duration": duration, "seed": seed, "replications": replications}, simulation_results,
+                interval=HISTORY_INTERVAL if series is not None else None, series=series
+            )
+
+
+def _recording_efficiency_score(junction: dict, flow_data: dict, duration: int, seed: int, simulation_results: dict):
+    """
+    Stores the efficiency score on the junction (the mean, for replications) for sorting and filtering.
+
+    Only unseeded runs over the traffic flow's default duration are
+    recorded, so every junction is ranked by the same experiment; a
+    shorter or seeded run, or a cache hit for one, leaves it as it was.
+    """
+    if seed is not None or duration != default_duration(flow_data):
+        return
+    efficiency_score = simulation_results.get("efficiency_score")
+    if isinstance(efficiency_score, dict):
+        efficiency_score = efficiency_score.get("mean")
+    if junction.get("id") is not None and efficiency_score is not None:
+        updating_junction_efficiency_score(junction["id"], efficiency_score)
@@ -1,12 +1,21 @@
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import undefer, joinedload
+from sqlalchemy import or_, and_, func, event
+from datetime import datetime
 import json
 import os
+import socket
 
-from .models.db_models import TrafficFlow, JunctionConfiguration, init_db, get_session
+from .models.db_models import TrafficFlow, JunctionConfiguration, SimulationCacheEntry, SimulationRun, SimulationJob, SessionFactory
+from .models.configuration_summaries import TrafficFlowSummary, JunctionSummary
+from .db_session import session_scope
+from .result_cache import simulation_cache, config_cache
+from .metrics import timed_storage_call
+from .processes import process_alive
+from .simulation import ENGINE_VERSION
 
-# Initialize the database
-engine = init_db()
+class ConfigurationNameTaken(Exception):
+    """Raised when a write hits the unique constraint on a traffic flow or junction name."""
 
 def get_traffic_flow_by_name_or_id(session, identifier):
     """Helper function to get a traffic flow by name or ID"""
@@ -18,109 +27,45 @@ def get_traffic_flow_by_name_or_id(session, identifier):
         return session.query(TrafficFlow).filter(TrafficFlow.name == identifier).first()
 
 def get_junction_by_name_or_id(session, identifier):
-    """Helper function to get a junction by name or ID"""
+    """Helper function to get a junction by name or ID, with its traffic flow's name joined in"""
+    query = session.query(JunctionConfiguration).options(_joining_traffic_flow_name())
     if isinstance(identifier, int) or (isinstance(identifier, str) and identifier.isdigit()):
         # If ID is provided as an integer or digit string
-        return session.query(JunctionConfiguration).filter(JunctionConfiguration.id == int(identifier)).first()
+        return query.filter(JunctionConfiguration.id == int(identifier)).first()
     else:
         # Otherwise try to find by name
-        return session.query(JunctionConfiguration).filter(JunctionConfiguration.name == identifier).first()
+        return query.filter(JunctionConfiguration.name == identifier).first()
 
-def migrate_json_to_db():
-    """
-    One-time function to migrate data from JSON file to SQLAlchemy database
-    """
-    JSON_FILE_PATH = "backend/database/storing_configs.json"
-    
-    if not os.path.exists(JSON_FILE_PATH):
-        print("No JSON file found for migration")
-        return False
-    
-    try:
-        with open(JSON_FILE_PATH, "r") as file:
-            data = json.load(file)
-        
-        traffic_flows = data.get("traffic_flow_configurations", {})
-        junction_configs = data.get("junction_configurations", {})
-        
-        session = get_session(engine)
-        
-        # First, migrate traffic flows
-        name_to_id_map = {}  # To map traffic flow names to their new IDs
-        
-        for name, flow_data in traffic_flows.items():
-            # Create a proper flow object structure if needed
-            if "flows" not in flow_data:
-                # Convert old format to new format
-                restructured_data = {
-                    "name": name,
-                    "flows": {}
-                }
-                
-                for direction in ["northbound", "southbound", "eastbound", "westbound"]:
-                    if direction in flow_data:
-                        exit_data = flow_data[direction]
-                        
-                        # Calculate total flow
-                        total_flow = sum(exit_data.values())
-                        
-                        restructured_data["flows"][direction] = {
-                            "incoming_flow": total_flow,
-                            "exits": exit_data
-                        }
-                
-                flow_data = restructured_data
-            
-            tf = TrafficFlow.from_dict(flow_data)
-            session.add(tf)
-            session.flush()  # To get the ID
-            name_to_id_map[name] = tf.id
-        
-        # Then, migrate junction configurations
-        for name, junction_data in junction_configs.items():
-            traffic_flow_name = junction_data.get("traffic_flow_config")
-            
-            if traffic_flow_name in name_to_id_map:
-                traffic_flow_id = name_to_id_map[traffic_flow_name]
-                jc = JunctionConfiguration.from_dict(junction_data, traffic_flow_id)
-                session.add(jc)
-        
-        session.commit()
-        return True
-    
-    except Exception as e:
-        print(f"Migration error: {e}")
-        session.rollback()
-        return False
-    finally:
-        session.close()
+def _joining_traffic_flow_name():
+    """Loader option that joins each junction's traffic flow, without its flow JSON, for to_dict"""
+    return joinedload(JunctionConfiguration.traffic_flow).load_only(TrafficFlow.id, TrafficFlow.name)
 
 # Main storage functions
 
+@timed_storage_call
 def loading_traffic_flows():
     """Get all traffic flow configurations"""
     # First try SQLAlchemy storage
     try:
-        session = get_session(engine)
-        flows = session.query(TrafficFlow).all()
-        
-        result = {
-            "traffic_flow_configurations": {},
-            "junction_configurations": {}
-        }
-        
-        for flow in flows:
-            flow_dict = flow.to_dict()
-            result["traffic_flow_configurations"][flow.name] = flow_dict
-        
-        # Add junction configurations too
-        junctions = session.query(JunctionConfiguration).all()
-        for junction in junctions:
-            junction_dict = junction.to_dict()
-            result["junction_configurations"][junction.name] = junction_dict
-        
-        session.close()
-        return result
+        with session_scope() as session:
+            flows = session.query(TrafficFlow).all()
+            
+            result = {
+                "traffic_flow_configurations": {},
+                "junction_configurations": {}
+            }
+            
+            for flow in flows:
+                flow_dict = flow.to_dict()
+                result["traffic_flow_configurations"][flow.name] = flow_dict
+            
+            # Add junction configurations too
+            junctions = session.query(JunctionConfiguration).options(_joining_traffic_flow_name()).all()
+            for junction in junctions:
+                junction_dict = junction.to_dict()
+                result["junction_configurations"][junction.name] = junction_dict
+            
+            return result
     
     except Exception as e:
         print(f"Error using SQLAlchemy storage, falling back to JSON: {e}")
@@ -137,6 +82,7 @@ def loading_traffic_flows():
             print(f"Error loading JSON file: {json_e}")
             return {"traffic_flow_configurations": {}, "junction_configurations": {}}
 
+@timed_storage_call
 def saving_traffic_flows(data):
     """Legacy function to save the entire JSON structure"""
     # This is mainly for backward compatibility
@@ -149,221 +95,910 @@ def saving_traffic_flows(data):
         print(f"Error saving traffic flows to JSON: {e}")
         return False
 
+@timed_storage_call
 def get_all_traffic_flows():
     """Get all traffic flow configurations as a list"""
-    session = get_session(engine)
     try:
-        flows = session.query(TrafficFlow).all()
-        return [flow.to_dict() for flow in flows]
+        with session_scope() as session:
+            flows = session.query(TrafficFlow).all()
+            return [flow.to_dict() for flow in flows]
     except SQLAlchemyError as e:
         print(f"Database error getting all traffic flows: {e}")
         return []
-    finally:
-        session.close()
 
+# Columns the list endpoints can filter and sort on
+TRAFFIC_FLOW_LIST_COLUMNS = {
+    "id": TrafficFlow.id,
+    "name": TrafficFlow.name,
+    "northbound": TrafficFlow.northbound_flow,
+    "southbound": TrafficFlow.southbound_flow,
+    "eastbound": TrafficFlow.eastbound_flow,
+    "westbound": TrafficFlow.westbound_flow,
+    "total": TrafficFlow.total_flow
+}
+
+JUNCTION_LIST_COLUMNS = {
+    "id": JunctionConfiguration.id,
+    "name": JunctionConfiguration.name,
+    "lanes": JunctionConfiguration.total_lanes,
+    "efficiency": JunctionConfiguration.efficiency_score,
+    "has_left_turn_lane": JunctionConfiguration.has_left_turn_lane,
+    "has_bus_lane": JunctionConfiguration.has_bus_lane,
+    "has_cycle_lane": JunctionConfiguration.has_cycle_lane,
+    "has_pedestrian_crossing": JunctionConfiguration.has_pedestrian_crossing
+}
+
+def _applying_list_query(query, columns, filters, sort, id_column, after=None, limit=None):
+    """
+    Adds filters on the summary columns, an ORDER BY and a keyset page.
+    
+    Rows are ordered by the sort column with NULLs last and ties broken by
+    ID, so (sort value, ID) of the last row of a page is enough to seek to
+    the start of the next one through the column's index.
+    """
+    for (field, bound), value in (filters or {}).items():
+        column = columns[field]
+        if bound == "min":
+            query = query.filter(column >= value)
+        elif bound == "max":
+            query = query.filter(column <= value)
+        else:
+            query = query.filter(column == value)
+    
+    field, descending = sort or ("id", False)
+    column = columns[field]
+    
+    if after is not None:
+        value, last_id = after
+        if value is None:
+            query = query.filter(column.is_(None), id_column > last_id)
+        else:
+            beyond = column < value if descending else column > value
+            query = query.filter(or_(beyond, and_(column == value, id_column > last_id), column.is_(None)))
+    
+    order = column.desc() if descending else column.asc()
+    query = query.order_by(column.is_(None), order, id_column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+@timed_storage_call
+def getting_traffic_flow_summaries(filters=None, sort=None, after=None, limit=None):
+    """Get a page of TrafficFlowSummary with junction counts in a single grouped query, filtered and sorted in SQL"""
+    try:
+        with session_scope() as session:
+            query = session.query(
+                TrafficFlow.id,
+                TrafficFlow.name,
+                TrafficFlow.northbound_flow,
+                TrafficFlow.southbound_flow,
+                TrafficFlow.eastbound_flow,
+                TrafficFlow.westbound_flow,
+                TrafficFlow.total_flow,
+                func.count(JunctionConfiguration.id)
+            ).outerjoin(
+                JunctionConfiguration, JunctionConfiguration.traffic_flow_id == TrafficFlow.id
+            ).group_by(TrafficFlow.id)
+            query = _applying_list_query(query, TRAFFIC_FLOW_LIST_COLUMNS, filters, sort, TrafficFlow.id, after, limit)
+            
+            return [TrafficFlowSummary(*row) for row in query.all()]
+    except SQLAlchemyError as e:
+        print(f"Database error getting traffic flow summaries: {e}")
+        return []
+
+@timed_storage_call
+def getting_junction_summaries(filters=None, sort=None, traffic_flow_id=None, after=None, limit=None, with_metrics=True):
+    """
+    Get a page of JunctionSummary, filtered and sorted in SQL
+    
+    Only summary columns are selected and the traffic flow name comes from
+    the same joined query, so junction_data is never read or decoded; the
+    metrics JSON is only read with_metrics.
+    """
+    columns = [
+        JunctionConfiguration.id,
+        JunctionConfiguration.name,
+        TrafficFlow.name,
+        JunctionConfiguration.total_lanes,
+        JunctionConfiguration.has_left_turn_lane,
+        JunctionConfiguration.has_bus_lane,
+        JunctionConfiguration.has_cycle_lane,
+        JunctionConfiguration.has_pedestrian_crossing,
+        JunctionConfiguration.efficiency_score
+    ]
+    if with_metrics:
+        columns.append(JunctionConfiguration.metrics_data)
+    
+    try:
+        with session_scope() as session:
+            query = session.query(*columns).join(TrafficFlow, JunctionConfiguration.traffic_flow_id == TrafficFlow.id)
+            if traffic_flow_id is not None:
+                query = query.filter(JunctionConfiguration.traffic_flow_id == traffic_flow_id)
+            query = _applying_list_query(query, JUNCTION_LIST_COLUMNS, filters, sort, JunctionConfiguration.id, after, limit)
+            
+            return [JunctionSummary(*row) for row in query.all()]
+    except SQLAlchemyError as e:
+        print(f"Database error getting junction summaries: {e}")
+        return []
+
+@timed_storage_call
+def getting_traffic_flow_names():
+    """Get the name of every traffic flow, keyed by ID, without loading flow data"""
+    try:
+        with session_scope() as session:
+            return dict(session.query(TrafficFlow.id, TrafficFlow.name).all())
+    except SQLAlchemyError as e:
+        print(f"Database error getting traffic flow names: {e}")
+        return {}
+
+@timed_storage_call
+def getting_traffic_flow_name_taken(name, excluding_id=None):
+    """Whether a traffic flow other than excluding_id has this name, as one indexed EXISTS query"""
+    try:
+        with session_scope() as session:
+            query = session.query(TrafficFlow.id).filter(TrafficFlow.name == name)
+            if excluding_id is not None:
+                query = query.filter(TrafficFlow.id != int(excluding_id))
+            return session.query(query.exists()).scalar()
+    except SQLAlchemyError as e:
+        print(f"Database error checking traffic flow name {name}: {e}")
+        return False
+
+@timed_storage_call
+def getting_traffic_flow_count():
+    """Number of stored traffic flows"""
+    try:
+        with session_scope() as session:
+            return session.query(func.count(TrafficFlow.id)).scalar()
+    except SQLAlchemyError as e:
+        print(f"Database error counting traffic flows: {e}")
+        return 0
+
+@timed_storage_call
+def getting_junction_name_taken(name, excluding_id=None):
+    """Whether a junction other than excluding_id has this name, as one indexed EXISTS query"""
+    try:
+        with session_scope() as session:
+            query = session.query(JunctionConfiguration.id).filter(JunctionConfiguration.name == name)
+            if excluding_id is not None:
+                query = query.filter(JunctionConfiguration.id != int(excluding_id))
+            return session.query(query.exists()).scalar()
+    except SQLAlchemyError as e:
+        print(f"Database error checking junction name {name}: {e}")
+        return False
+
+@timed_storage_call
+def getting_junction_count(traffic_flow_id):
+    """Number of junctions stored for a traffic flow"""
+    try:
+        with session_scope() as session:
+            return session.query(func.count(JunctionConfiguration.id)).filter(
+                JunctionConfiguration.traffic_flow_id == int(traffic_flow_id)
+            ).scalar()
+    except SQLAlchemyError as e:
+        print(f"Database error counting junctions for traffic flow {traffic_flow_id}: {e}")
+        return 0
+
+@timed_storage_call
 def getting_traffic_flow(flow_id):
-    """Get a specific traffic flow by ID or name"""
-    session = get_session(engine)
+    """Get a specific traffic flow by ID or name, reading through the configuration cache"""
+    cache_key = ("traffic_flow", str(flow_id))
+    cached = config_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    generation = config_cache.generation
     try:
-        flow = get_traffic_flow_by_name_or_id(session, flow_id)
-        if flow:
-            return flow.to_dict()
-        return None
+        with session_scope() as session:
+            flow = get_traffic_flow_by_name_or_id(session, flow_id)
+            if flow:
+                flow_dict = flow.to_dict()
+                _caching_configuration(session, cache_key, flow_dict, generation, [("traffic_flow", flow.name)])
+                return flow_dict
+            return None
     except SQLAlchemyError as e:
         print(f"Database error getting traffic flow {flow_id}: {e}")
         return None
-    finally:
-        session.close()
 
+@timed_storage_call
 def saving_traffic_flow(flow_obj):
-    """Save a new traffic flow"""
-    session = get_session(engine)
-    try:
-        # Check if a flow with this name already exists
-        existing = session.query(TrafficFlow).filter(TrafficFlow.name == flow_obj.name).first()
-        if existing:
-            print(f"Error: Traffic flow with name '{flow_obj.name}' already exists")
-            return False
-        
-        # Create new TrafficFlow database object
-        flow_dict = flow_obj.to_dict()
-        db_flow = TrafficFlow(
-            name=flow_dict["name"],
-            flow_data=flow_dict["flows"]
-        )
-        
-        session.add(db_flow)
-        session.commit()
-        return True
+    """Save a new traffic flow, raising ConfigurationNameTaken if its name is already stored"""
+    try:
+        with session_scope() as session:
+            # Create new TrafficFlow database object
+            flow_dict = flow_obj.to_dict()
+            db_flow = TrafficFlow(
+                name=flow_dict["name"],
+                flow_data=flow_dict["flows"]
+            )
+            
+            # The unique index on name rejects duplicates, even from a concurrent request
+            session.add(db_flow)
+            return True
+    except IntegrityError:
+        raise ConfigurationNameTaken(f"Traffic configuration name '{flow_obj.name}' already exists.")
     except SQLAlchemyError as e:
         print(f"Database error saving traffic flow: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
 
-def updating_traffic_flow(flow_obj):
-    """Update an existing traffic flow"""
-    session = get_session(engine)
+@timed_storage_call
+def updating_traffic_flow(flow_obj, flow_id=None):
+    """
+    Update an existing traffic flow in place, renaming it if flow_obj has a new name
+    
+    The flow is found by flow_id (ID or name), or by flow_obj's name if no
+    flow_id is given. Its ID and junctions are kept, and cached lookups and
+    results are dropped under both the old and the new name. Raises
+    ConfigurationNameTaken if the new name belongs to another flow.
+    """
     try:
-        existing = session.query(TrafficFlow).filter(TrafficFlow.name == flow_obj.name).first()
-        if not existing:
-            print(f"Error: Traffic flow '{flow_obj.name}' not found for update")
-            return False
-        
-        # Update the flow data
-        flow_dict = flow_obj.to_dict()
-        existing.flow_data = flow_dict["flows"]
-        
-        session.commit()
-        return True
+        with session_scope() as session:
+            existing = get_traffic_flow_by_name_or_id(session, flow_id if flow_id is not None else flow_obj.name)
+            if not existing:
+                print(f"Error: Traffic flow '{flow_id if flow_id is not None else flow_obj.name}' not found for update")
+                return False
+            
+            old_name = existing.name
+            existing.name = flow_obj.name
+            
+            # Update the flow data
+            flow_dict = flow_obj.to_dict()
+            existing.flow_data = flow_dict["flows"]
+            
+            for name in {old_name, flow_obj.name}:
+                _invalidate_cached_simulations(session, traffic_flow_name=name)
+                _invalidate_cached_configurations(session, traffic_flow_name=name)
+            return True
+    except IntegrityError:
+        raise ConfigurationNameTaken(f"Traffic configuration name '{flow_obj.name}' already exists.")
     except SQLAlchemyError as e:
         print(f"Database error updating traffic flow: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
 
+@timed_storage_call
 def deleting_traffic_flow(flow_id):
     """Delete a traffic flow and all its associated junctions"""
-    session = get_session(engine)
     try:
-        flow = get_traffic_flow_by_name_or_id(session, flow_id)
-        if not flow:
-            print(f"Error: Traffic flow '{flow_id}' not found for deletion")
-            return False
-        
-        # The cascade will delete associated junctions
-        session.delete(flow)
-        session.commit()
-        return True
+        with session_scope() as session:
+            flow = get_traffic_flow_by_name_or_id(session, flow_id)
+            if not flow:
+                print(f"Error: Traffic flow '{flow_id}' not found for deletion")
+                return False
+            
+            # The cascade will delete associated junctions
+            _invalidate_cached_simulations(session, traffic_flow_name=flow.name)
+            _invalidate_cached_configurations(session, traffic_flow_name=flow.name)
+            session.delete(flow)
+            return True
     except SQLAlchemyError as e:
         print(f"Database error deleting traffic flow: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
 
+@timed_storage_call
 def loading_junctions_configurations():
     """Get all junction configurations"""
-    session = get_session(engine)
     try:
-        junctions = session.query(JunctionConfiguration).all()
-        result = {}
-        for junction in junctions:
-            result[junction.name] = junction.to_dict()
-        return result
+        with session_scope() as session:
+            junctions = session.query(JunctionConfiguration).options(_joining_traffic_flow_name()).all()
+            result = {}
+            for junction in junctions:
+                result[junction.name] = junction.to_dict()
+            return result
     except SQLAlchemyError as e:
         print(f"Database error getting all junction configurations: {e}")
         return {}
-    finally:
-        session.close()
 
-def getting_junction_configuration(junction_id):
-    """Get a specific junction configuration by ID or name"""
-    session = get_session(engine)
+@timed_storage_call
+def getting_junctions_with_traffic_flows(identifiers):
+    """Get junction configurations by ID or name in one query, with each traffic flow they use loaded once; returns (junctions, traffic flows by name)"""
+    ids = [int(identifier) for identifier in identifiers if isinstance(identifier, int) or str(identifier).isdigit()]
+    names = [identifier for identifier in identifiers if isinstance(identifier, str) and not identifier.isdigit()]
+    
     try:
-        junction = get_junction_by_name_or_id(session, junction_id)
-        if junction:
-            return junction.to_dict()
+        with session_scope() as session:
+            junctions = session.query(JunctionConfiguration).options(
+                joinedload(JunctionConfiguration.traffic_flow)
+            ).filter(or_(JunctionConfiguration.id.in_(ids), JunctionConfiguration.name.in_(names))).all()
+            
+            traffic_flows = {}
+            for junction in junctions:
+                if junction.traffic_flow is not None and junction.traffic_flow.name not in traffic_flows:
+                    traffic_flows[junction.traffic_flow.name] = junction.traffic_flow.to_dict()
+            
+            return [junction.to_dict() for junction in junctions], traffic_flows
+    except SQLAlchemyError as e:
+        print(f"Database error getting junction configurations {identifiers}: {e}")
         return None
+
+@timed_storage_call
+def getting_junction_configuration(junction_id):
+    """Get a specific junction configuration by ID or name, reading through the configuration cache"""
+    cache_key = ("junction", str(junction_id))
+    cached = config_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    generation = config_cache.generation
+    try:
+        with session_scope() as session:
+            junction = get_junction_by_name_or_id(session, junction_id)
+            if junction:
+                junction_dict = junction.to_dict()
+                _caching_configuration(session, cache_key, junction_dict, generation, [
+                    ("junction", junction.name),
+                    ("traffic_flow", junction_dict["traffic_flow_config"])
+                ])
+                return junction_dict
+            return None
     except SQLAlchemyError as e:
         print(f"Database error getting junction configuration {junction_id}: {e}")
         return None
-    finally:
-        session.close()
 
+@timed_storage_call
 def saving_junction_configuration(junction_obj):
-    """Save a new junction configuration"""
-    session = get_session(engine)
+    """Save a new junction configuration, raising ConfigurationNameTaken if its name is already stored"""
     try:
-        # Check if a junction with this name already exists
-        existing = session.query(JunctionConfiguration).filter(
-            JunctionConfiguration.name == junction_obj.name
-        ).first()
-        
-        if existing:
-            print(f"Error: Junction configuration '{junction_obj.name}' already exists")
-            return False
-        
-        # Get the associated traffic flow
-        traffic_flow = session.query(TrafficFlow).filter(
-            TrafficFlow.name == junction_obj.traffic_flow_name
-        ).first()
-        
-        if not traffic_flow:
-            print(f"Error: Traffic flow '{junction_obj.traffic_flow_name}' not found")
-            return False
-        
-        # Create dictionary representation of junction data
-        junction_dict = junction_obj.to_dict()
-        
-        # Extract junction-specific data
-        junction_data = {}
-        metrics_data = {}
-        
-        # Extract direction-specific data
-        for direction in ['northbound', 'southbound', 'eastbound', 'westbound']:
-            if direction in junction_dict:
-                junction_data[direction] = junction_dict[direction]
-        
-        # Extract metrics if they exist
-        if 'metrics' in junction_dict:
-            metrics_data = junction_dict['metrics']
-        
-        # Create new JunctionConfiguration database object
-        db_junction = JunctionConfiguration(
-            name=junction_obj.name,
-            traffic_flow_id=traffic_flow.id,
-            junction_data=junction_data,
-            metrics_data=metrics_data
-        )
-        
-        session.add(db_junction)
-        session.commit()
-        return True
+        with session_scope() as session:
+            # Get the associated traffic flow
+            traffic_flow = session.query(TrafficFlow).filter(
+                TrafficFlow.name == junction_obj.traffic_flow_name
+            ).first()
+            
+            if not traffic_flow:
+                print(f"Error: Traffic flow '{junction_obj.traffic_flow_name}' not found")
+                return False
+            
+            # Create dictionary representation of junction data
+            junction_dict = junction_obj.to_dict()
+            
+            # Extract junction-specific data
+            junction_data = {}
+            metrics_data = {}
+            
+            # Extract direction-specific data
+            for direction in ['northbound', 'southbound', 'eastbound', 'westbound']:
+                if direction in junction_dict:
+                    junction_data[direction] = junction_dict[direction]
+            
+            # Extract metrics if they exist
+            if 'metrics' in junction_dict:
+                metrics_data = junction_dict['metrics']
+            
+            # Create new JunctionConfiguration database object
+            db_junction = JunctionConfiguration(
+                name=junction_obj.name,
+                traffic_flow_id=traffic_flow.id,
+                junction_data=junction_data,
+                metrics_data=metrics_data
+            )
+            
+            session.add(db_junction)
+            _invalidate_cached_simulations(session, junction_name=junction_obj.name)
+            _invalidate_cached_configurations(session, junction_name=junction_obj.name)
+            return True
+    except IntegrityError:
+        raise ConfigurationNameTaken(f"Junction configuration name '{junction_obj.name}' already exists.")
     except SQLAlchemyError as e:
         print(f"Database error saving junction configuration: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
 
+@timed_storage_call
+def updating_junction_configuration(junction_id, junction_obj):
+    """
+    Update an existing junction configuration in place, renaming or moving it if needed
+    
+    The junction keeps its ID. Its stored metrics and efficiency score are
+    cleared if the junction's settings change, since they describe the old
+    layout, and cached lookups and results are dropped under both names.
+    Raises ConfigurationNameTaken if the new name belongs to another junction.
+    """
+    try:
+        with session_scope() as session:
+            existing = get_junction_by_name_or_id(session, junction_id)
+            if not existing:
+                print(f"Error: Junction configuration '{junction_id}' not found for update")
+                return False
+            
+            old_name = existing.name
+            existing.name = junction_obj.name
+            
+            traffic_flow = session.query(TrafficFlow).filter(
+                TrafficFlow.name == junction_obj.traffic_flow_name
+            ).first()
+            
+            if not traffic_flow:
+                print(f"Error: Traffic flow '{junction_obj.traffic_flow_name}' not found")
+                return False
+            
+            junction_dict = junction_obj.to_dict()
+            junction_data = {
+                direction: junction_dict[direction]
+                for direction in ['northbound', 'southbound', 'eastbound', 'westbound']
+                if direction in junction_dict
+            }
+            
+            if junction_data != existing.junction_data or traffic_flow.id != existing.traffic_flow_id:
+                existing.junction_data = junction_data
+                existing.metrics_data = {}
+                existing.efficiency_score = None
+            existing.traffic_flow_id = traffic_flow.id
+            
+            for name in {old_name, junction_obj.name}:
+                _invalidate_cached_simulations(session, junction_name=name)
+                _invalidate_cached_configurations(session, junction_name=name)
+            return True
+    except IntegrityError:
+        raise ConfigurationNameTaken(f"Junction configuration name '{junction_obj.name}' already exists.")
+    except SQLAlchemyError as e:
+        print(f"Database error updating junction configuration: {e}")
+        return False
+
+@timed_storage_call
 def deleting_junction_configuration(junction_id):
     """Delete a junction configuration"""
-    session = get_session(engine)
     try:
-        junction = get_junction_by_name_or_id(session, junction_id)
-        if not junction:
-            print(f"Error: Junction configuration '{junction_id}' not found for deletion")
-            return False
-        
-        session.delete(junction)
-        session.commit()
-        return True
+        with session_scope() as session:
+            junction = get_junction_by_name_or_id(session, junction_id)
+            if not junction:
+                print(f"Error: Junction configuration '{junction_id}' not found for deletion")
+                return False
+            
+            _invalidate_cached_simulations(session, junction_name=junction.name)
+            _invalidate_cached_configurations(session, junction_name=junction.name)
+            session.delete(junction)
+            return True
     except SQLAlchemyError as e:
         print(f"Database error deleting junction configuration: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
 
+@timed_storage_call
+def updating_junction_efficiency_score(junction_id, efficiency_score):
+    """Record the efficiency score of a junction's latest default-length, unseeded simulation"""
+    try:
+        with session_scope() as session:
+            junction = get_junction_by_name_or_id(session, junction_id)
+            if not junction:
+                return False
+            
+            junction.efficiency_score = efficiency_score
+            return True
+    except SQLAlchemyError as e:
+        print(f"Database error updating junction efficiency score: {e}")
+        return False
+
+@timed_storage_call
 def get_functions_for_traffic_flow(flow_id):
     """Get all junction configurations for a specific traffic flow"""
-    session = get_session(engine)
     try:
-        flow = get_traffic_flow_by_name_or_id(session, flow_id)
-        if not flow:
-            print(f"Error: Traffic flow '{flow_id}' not found")
-            return None
-        
-        junctions = session.query(JunctionConfiguration).filter(
-            JunctionConfiguration.traffic_flow_id == flow.id
-        ).all()
-        
-        return [junction.to_dict() for junction in junctions]
+        with session_scope() as session:
+            flow = get_traffic_flow_by_name_or_id(session, flow_id)
+            if not flow:
+                print(f"Error: Traffic flow '{flow_id}' not found")
+                return None
+            
+            junctions = session.query(JunctionConfiguration).filter(
+                JunctionConfiguration.traffic_flow_id == flow.id
+            ).all()
+            
+            return [junction.to_dict() for junction in junctions]
     except SQLAlchemyError as e:
         print(f"Database error getting junctions for traffic flow {flow_id}: {e}")
         return None
-    finally:
-        session.close()
\ No newline at end of file
+
+# Bulk import and export
+
+def streaming_configurations(batch_size=500):
+    """
+    Yield every traffic flow and then every junction configuration as ("traffic_flow" | "junction", dict).
+    
+    Rows are fetched batch_size at a time, and each junction's traffic flow
+    name comes from the same joined query, so memory use stays flat however
+    many configurations are stored.
+    """
+    try:
+        with session_scope(shared=False) as session:
+            for flow in session.query(TrafficFlow).order_by(TrafficFlow.id).yield_per(batch_size):
+                yield "traffic_flow", flow.to_dict()
+            
+            junctions = session.query(JunctionConfiguration).options(
+                _joining_traffic_flow_name()
+            ).order_by(JunctionConfiguration.id).yield_per(batch_size)
+            for junction in junctions:
+                yield "junction", junction.to_dict()
+    except SQLAlchemyError as e:
+        print(f"Database error streaming configurations: {e}")
+
+@timed_storage_call
+def bulk_saving_configurations(traffic_flows, junctions, max_traffic_flows, max_junctions_per_flow):
+    """
+    Insert a batch of validated configurations in one transaction using bulk inserts.
+    
+    Both arguments are lists of (key, data) pairs; junction data names its
+    traffic flow in "traffic_flow_config", which may be stored already or be
+    in this batch. Records whose name is taken, whose traffic flow is
+    missing or that would go over a cap are skipped. Returns ({key: error}
+    for the skipped records, number inserted), or None if the batch could
+    not be saved.
+    """
+    errors = {}
+    try:
+        with session_scope(shared=False) as session:
+            flow_names = [data["name"] for _, data in traffic_flows]
+            junction_names = [data["name"] for _, data in junctions]
+            
+            # One query per check for the whole batch
+            taken_flow_names = {row[0] for row in session.query(TrafficFlow.name).filter(TrafficFlow.name.in_(flow_names))}
+            taken_junction_names = {
+                row[0] for row in session.query(JunctionConfiguration.name).filter(JunctionConfiguration.name.in_(junction_names))
+            }
+            flow_count = session.query(func.count(TrafficFlow.id)).scalar()
+            
+            flow_mappings = []
+            for key, data in traffic_flows:
+                if data["name"] in taken_flow_names:
+                    errors[key] = f"Traffic configuration name '{data['name']}' already exists."
+                elif flow_count >= max_traffic_flows:
+                    errors[key] = f"The maximum number of traffic configurations ({max_traffic_flows}) are already being stored."
+                else:
+                    flow = TrafficFlow.from_dict(data)
+                    flow.refresh_summary()
+                    flow_mappings.append(_bulk_mapping(flow))
+                    taken_flow_names.add(data["name"])
+                    flow_count += 1
+            
+            session.bulk_insert_mappings(TrafficFlow, flow_mappings)
+            
+            referenced_names = {data.get("traffic_flow_config") for _, data in junctions}
+            flow_ids = dict(session.query(TrafficFlow.name, TrafficFlow.id).filter(TrafficFlow.name.in_(referenced_names)))
+            junction_counts = dict(session.query(
+                JunctionConfiguration.traffic_flow_id, func.count(JunctionConfiguration.id)
+            ).filter(JunctionConfiguration.traffic_flow_id.in_(flow_ids.values())).group_by(JunctionConfiguration.traffic_flow_id))
+            
+            junction_mappings = []
+            for key, data in junctions:
+                traffic_flow_name = data.get("traffic_flow_config")
+                traffic_flow_id = flow_ids.get(traffic_flow_name)
+                if data["name"] in taken_junction_names:
+                    errors[key] = f"Junction configuration name '{data['name']}' already exists."
+                elif traffic_flow_id is None:
+                    errors[key] = f"Traffic flow configuration '{traffic_flow_name}' not found"
+                elif junction_counts.get(traffic_flow_id, 0) >= max_junctions_per_flow:
+                    errors[key] = (
+                        f"Traffic flow configuration '{traffic_flow_name}' has already reached the maximum of "
+                        f"{max_junctions_per_flow} junction configurations."
+                    )
+                else:
+                    junction = JunctionConfiguration.from_dict(data, traffic_flow_id)
+                    junction.refresh_summary()
+                    junction_mappings.append(_bulk_mapping(junction))
+                    taken_junction_names.add(data["name"])
+                    junction_counts[traffic_flow_id] = junction_counts.get(traffic_flow_id, 0) + 1
+            
+            session.bulk_insert_mappings(JunctionConfiguration, junction_mappings)
+            return errors, len(flow_mappings) + len(junction_mappings)
+    except SQLAlchemyError as e:
+        print(f"Database error bulk saving configurations: {e}")
+        return None
+
+def _bulk_mapping(row):
+    """Column values of an unsaved row, for bulk_insert_mappings"""
+    return {column.key: getattr(row, column.key) for column in row.__table__.columns if column.key != "id"}
+
+# Configuration cache
+
+def _caching_configuration(session, cache_key, value, generation, tags):
+    """Caches a configuration read, unless the session has uncommitted configuration writes"""
+    if not session.info.get("stale_configuration_tags"):
+        config_cache.put(cache_key, value, tags=tags, generation=generation)
+
+def _invalidate_cached_configurations(session, junction_name=None, traffic_flow_name=None):
+    """Drops cached lookups for a junction, or a traffic flow and its junctions, now and when the transaction ends"""
+    tags = set()
+    if junction_name is not None:
+        tags.add(("junction", junction_name))
+    if traffic_flow_name is not None:
+        tags.add(("traffic_flow", traffic_flow_name))
+    
+    for tag in tags:
+        config_cache.invalidate(tag)
+    
+    # Other sessions can re-cache the old rows until this transaction commits
+    session.info.setdefault("stale_configuration_tags", set()).update(tags)
+
+@event.listens_for(SessionFactory, "after_transaction_end")
+def _invalidating_after_transaction(session, transaction):
+    if transaction.parent is None:
+        for tag in session.info.pop("stale_configuration_tags", ()):
+            config_cache.invalidate(tag)
+
+# Simulation result cache
+
+def _invalidate_cached_simulations(session, junction_name=None, traffic_flow_name=None):
+    """Drops cached results for a junction or traffic flow from both cache tiers"""
+    query = session.query(SimulationCacheEntry)
+    if junction_name is not None:
+        simulation_cache.invalidate(("junction", junction_name))
+        query.filter(SimulationCacheEntry.junction_name == junction_name).delete(synchronize_session=False)
+    if traffic_flow_name is not None:
+        simulation_cache.invalidate(("traffic_flow", traffic_flow_name))
+        query.filter(SimulationCacheEntry.traffic_flow_name == traffic_flow_name).delete(synchronize_session=False)
+
+@timed_storage_call
+def getting_cached_simulation(config_hash):
+    """Get cached simulation results by configuration hash, checking memory before the database"""
+    results = simulation_cache.get(config_hash)
+    if results is not None:
+        return results
+    
+    try:
+        with session_scope() as session:
+            entry = session.query(SimulationCacheEntry).filter(
+                SimulationCacheEntry.config_hash == config_hash,
+                SimulationCacheEntry.engine_version == ENGINE_VERSION
+            ).first()
+            if not entry:
+                return None
+            
+            # Promote to the in-process tier for the next lookup
+            simulation_cache.put(config_hash, entry.results, tags=[
+                ("junction", entry.junction_name),
+                ("traffic_flow", entry.traffic_flow_name)
+            ])
+            return entry.results
+    except SQLAlchemyError as e:
+        print(f"Database error getting cached simulation {config_hash}: {e}")
+        return None
+
+@timed_storage_call
+def saving_cached_simulation(config_hash, junction_name, traffic_flow_name, results):
+    """Save simulation results to both cache tiers"""
+    simulation_cache.put(config_hash, results, tags=[
+        ("junction", junction_name),
+        ("traffic_flow", traffic_flow_name)
+    ])
+    
+    try:
+        with session_scope() as session:
+            session.merge(SimulationCacheEntry(
+                config_hash=config_hash,
+                junction_name=junction_name,
+                traffic_flow_name=traffic_flow_name,
+                engine_version=ENGINE_VERSION,
+                results=results
+            ))
+            return True
+    except SQLAlchemyError as e:
+        print(f"Database error saving cached simulation: {e}")
+        return False
+
+@timed_storage_call
+def preloading_cached_simulations(limit):
+    """Load the most recently cached simulation results into the in-process tier; returns how many"""
+    try:
+        with session_scope(shared=False) as session:
+            entries = session.query(SimulationCacheEntry).filter(
+                SimulationCacheEntry.engine_version == ENGINE_VERSION
+            ).order_by(SimulationCacheEntry.created_at.desc()).limit(limit).all()
+            
+            # Oldest first, so the newest end up most recently used
+            for entry in reversed(entries):
+                simulation_cache.put(entry.config_hash, entry.results, tags=[
+                    ("junction", entry.junction_name),
+                    ("traffic_flow", entry.traffic_flow_name)
+                ])
+            return len(entries)
+    except SQLAlchemyError as e:
+        print(f"Database error preloading cached simulations: {e}")
+        return 0
+
+# Simulation run history
+
+@timed_storage_call
+def saving_simulation_run(junction_id, junction_name, traffic_flow_name, config_hash, options, results, interval=None, series=None):
+    """Save one simulation run with its aggregate scores and, optionally, its encoded interval series"""
+    # Replications store summary statistics for each metric; their means are aggregated
+    wait_times = [_mean_value(value) for value in (results.get("average_wait_times") or {}).values()]
+    queue_lengths = [_mean_value(value) for value in (results.get("max_queue_lengths") or {}).values()]
+    
+    try:
+        with session_scope() as session:
+            run = SimulationRun(
+                junction_id=int(junction_id),
+                junction_name=junction_name,
+                traffic_flow_name=traffic_flow_name,
+                config_hash=config_hash,
+                engine_version=ENGINE_VERSION,
+                duration=options.get("duration"),
+                seed=options.get("seed"),
+                replications=options.get("replications", 1),
+                efficiency_score=_mean_value(results.get("efficiency_score")),
+                sustainability_score=_mean_value(results.get("sustainability_score")),
+                average_wait_time=round(sum(wait_times) / len(wait_times), 1) if wait_times else None,
+                max_queue_length=round(max(queue_lengths)) if queue_lengths else None,
+                results=results,
+                interval=interval,
+                series=series
+            )
+            session.add(run)
+            session.flush()
+            return run.id
+    except SQLAlchemyError as e:
+        print(f"Database error saving simulation run: {e}")
+        return None
+
+def _mean_value(value):
+    """A metric's value, or its mean if it is a replication summary"""
+    return value.get("mean") if isinstance(value, dict) else value
+
+@timed_storage_call
+def getting_simulation_runs(junction_id, limit=20, before=None, config_hash=None):
+    """Get a junction's simulation runs newest first, without their series"""
+    try:
+        with session_scope() as session:
+            query = session.query(SimulationRun).filter(SimulationRun.junction_id == int(junction_id))
+            if before is not None:
+                query = query.filter(SimulationRun.created_at < before)
+            if config_hash is not None:
+                query = query.filter(SimulationRun.config_hash == config_hash)
+            
+            runs = query.order_by(SimulationRun.created_at.desc(), SimulationRun.id.desc()).limit(limit).all()
+            return [run.to_dict() for run in runs]
+    except SQLAlchemyError as e:
+        print(f"Database error getting simulation runs for junction {junction_id}: {e}")
+        return []
+
+@timed_storage_call
+def getting_simulation_run(run_id):
+    """Get a simulation run by ID as (run dict, encoded series or None) in one read"""
+    try:
+        with session_scope() as session:
+            run = session.query(SimulationRun).options(undefer(SimulationRun.series)).filter(
+                SimulationRun.id == int(run_id)
+            ).first()
+            if not run:
+                return None
+            return run.to_dict(), run.series
+    except SQLAlchemyError as e:
+        print(f"Database error getting simulation run {run_id}: {e}")
+        return None
+
+# Simulation jobs
+
+FINISHED_JOB_STATUSES = ("succeeded", "failed", "cancelled")
+
+@timed_storage_call
+def saving_simulation_job(job_id, junction_id, kind, options):
+    """Save a newly queued simulation job owned by this process"""
+    try:
+        with session_scope(shared=False) as session:
+            session.add(SimulationJob(
+                id=job_id,
+                junction_id=str(junction_id),
+                kind=kind,
+                options=options,
+                status="queued",
+                progress=0.0,
+                cancel_requested=False,
+                worker_pid=os.getpid(),
+                worker_token=_process_token(os.getpid())
+            ))
+            return True
+    except SQLAlchemyError as e:
+        print(f"Database error saving simulation job: {e}")
+        return False
+
+@timed_storage_call
+def getting_simulation_job(job_id):
+    """Get a simulation job by ID"""
+    try:
+        with session_scope(shared=False) as session:
+            job = session.query(SimulationJob).filter(SimulationJob.id == job_id).first()
+            if not job:
+                return None
+            
+            # Its process may have exited since the last restart check
+            if job.status in ("queued", "running") and _job_orphaned(job):
+                _failing_interrupted_job(job)
+            return job.to_dict()
+    except SQLAlchemyError as e:
+        print(f"Database error getting simulation job {job_id}: {e}")
+        return None
+
+@timed_storage_call
+def updating_simulation_job(job_id, **fields):
+    """Update the status, progress or results of a simulation job"""
+    try:
+        with session_scope(shared=False) as session:
+            job = session.query(SimulationJob).filter(SimulationJob.id == job_id).first()
+            if not job:
+                print(f"Error: Simulation job '{job_id}' not found for update")
+                return False
+            
+            if fields.get("status") == "running":
+                job.started_at = datetime.utcnow()
+            elif fields.get("status") in FINISHED_JOB_STATUSES:
+                job.finished_at = datetime.utcnow()
+            
+            for field, value in fields.items():
+                setattr(job, field, value)
+            
+            return True
+    except SQLAlchemyError as e:
+        print(f"Database error updating simulation job: {e}")
+        return False
+
+@timed_storage_call
+def updating_simulation_job_progress(job_id, progress):
+    """Record a running job's progress and return whether its cancellation was requested"""
+    try:
+        with session_scope(shared=False) as session:
+            job = session.query(SimulationJob).filter(SimulationJob.id == job_id).first()
+            if not job:
+                return True
+            
+            job.progress = progress
+            return job.cancel_requested
+    except SQLAlchemyError as e:
+        print(f"Database error updating simulation job progress: {e}")
+        return False
+
+@timed_storage_call
+def requesting_simulation_job_cancellation(job_id):
+    """Flag an unfinished job for cancellation; returns False if it is unknown or already finished"""
+    try:
+        with session_scope(shared=False) as session:
+            job = session.query(SimulationJob).filter(SimulationJob.id == job_id).first()
+            if not job or job.status in FINISHED_JOB_STATUSES:
+                return False
+            
+            job.cancel_requested = True
+            return True
+    except SQLAlchemyError as e:
+        print(f"Database error cancelling simulation job: {e}")
+        return False
+
+def _process_token(pid):
+    """Identify one run of a process by host, PID and, where /proc exists, start time, so a reused PID doesn't match"""
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            started = file.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        started = "" if process_alive(pid) else None
+    if started is None:
+        return None
+    return f"{socket.gethostname()}:{pid}:{started}"
+
+def _job_orphaned(job):
+    """Whether the process that accepted a job has exited; jobs owned by another host are left to it"""
+    if job.worker_token is None:
+        # Recorded before worker tokens were stored
+        return job.worker_pid != os.getpid() and not process_alive(job.worker_pid)
+    if job.worker_token.split(":", 1)[0] != socket.gethostname():
+        return False
+    return _process_token(job.worker_pid) != job.worker_token
+
+def _failing_interrupted_job(job):
+    """Mark an orphaned job as failed"""
+    job.status = "failed"
+    job.error = "Interrupted by a server restart"
+    job.finished_at = datetime.utcnow()
+
+@timed_storage_call
+def failing_interrupted_simulation_jobs():
+    """Mark jobs left queued or running by a process that no longer exists as failed"""
+    try:
+        with session_scope(shared=False) as session:
+            jobs = session.query(SimulationJob).filter(
+                SimulationJob.status.in_(("queued", "running"))
+            ).all()
+            
+            count = 0
+            for job in jobs:
+                if _job_orphaned(job):
+                    _failing_interrupted_job(job)
+                    count += 1
+            
+            return count
+    except SQLAlchemyError as e:
+        print(f"Database error failing interrupted simulation jobs: {e}")
+        return 0
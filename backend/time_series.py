@@ -0,0 +1,73 @@
+import json
+import struct
+import zlib
+
+from .simulation import DIRECTIONS
+
+# Per-direction series in each interval snapshot, and the scale that makes them whole numbers
+SERIES_FIELDS = {
+    "queue_lengths": 1,
+    "max_queue_lengths": 1,
+    "departures": 1,
+    "average_wait_times": 10,
+    "max_wait_times": 1
+}
+TIME_SCALE = 10
+
+FORMAT_VERSION = 1
+
+
+def encoding_series(snapshots: list) -> bytes:
+    """
+    Packs interval snapshots from JunctionSimulation.iter_intervals into a compact blob.
+
+    Every series is scaled to whole numbers (snapshots are rounded to 0.1 at
+    most), delta-encoded so slowly changing queues become runs of small
+    numbers, stored as int32 and zlib-compressed. A short JSON header
+    records the layout so older blobs stay readable if it changes.
+    """
+    # Only simulations recording history need numpy, so it isn't loaded at startup
+    import numpy as np
+
+    columns = [[round(snapshot["time"] * TIME_SCALE) for snapshot in snapshots]]
+    for field, scale in SERIES_FIELDS.items():
+        for direction in DIRECTIONS:
+            columns.append([round(snapshot[field][direction] * scale) for snapshot in snapshots])
+
+    values = np.array(columns, dtype=np.int64).reshape(len(columns), len(snapshots))
+    deltas = np.diff(values, axis=1, prepend=0).astype(np.int32)
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "count": len(snapshots),
+        "directions": DIRECTIONS,
+        "fields": SERIES_FIELDS,
+        "time_scale": TIME_SCALE
+    }, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(struct.pack("<I", len(header)) + header + deltas.tobytes(), 9)
+
+
+def decoding_series(blob: bytes) -> list:
+    """Unpacks a blob from encoding_series back into the list of interval snapshots."""
+    payload = zlib.decompress(blob)
+    (header_length,) = struct.unpack_from("<I", payload)
+    header = json.loads(payload[4:4 + header_length])
+    count = header["count"]
+    directions = header["directions"]
+    fields = header["fields"]
+    if count == 0:
+        return []
+
+    import numpy as np
+    deltas = np.frombuffer(payload[4 + header_length:], dtype=np.int32).reshape(-1, count)
+    values = np.cumsum(deltas, axis=1, dtype=np.int64)
+
+    times = values[0] / header["time_scale"]
+    snapshots = [{"time": float(time)} for time in times]
+    row = 1
+    for field, scale in fields.items():
+        for direction in directions:
+            for snapshot, value in zip(snapshots, values[row]):
+                snapshot.setdefault(field, {})[direction] = float(value) / scale if scale != 1 else int(value)
+            row += 1
+    return snapshots
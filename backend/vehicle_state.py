@@ -0,0 +1,68 @@
+from array import array
+
+# Exit each vehicle is heading for, stored as an index into EXITS (-1 if unknown)
+EXITS = ['exit_north', 'exit_east', 'exit_south', 'exit_west']
+EXIT_INDEX = {name: i for i, name in enumerate(EXITS)}
+
+# Vehicle classes, stored as an index into EVU_CLASSES
+EVU_CLASSES = ['car', 'bus', 'bicycle']
+CAR, BUS, BICYCLE = range(len(EVU_CLASSES))
+
+
+class VehicleRingBuffer:
+    """
+    FIFO of the vehicles queued on one lane, stored column-wise in typed arrays.
+
+    Each vehicle is an arrival time, exit index and EVU class in three parallel
+    arrays rather than a Python object, so a queue of any length costs ten
+    bytes per vehicle and creates no garbage. The capacity is a power of two
+    that doubles when full, so it settles at the longest queue seen and stays
+    there for the rest of the run. The lane is the buffer itself.
+    """
+
+    __slots__ = ("arrival", "exit", "evu", "head", "size", "mask")
+
+    def __init__(self, capacity: int = 64):
+        capacity = 1 << max(0, capacity - 1).bit_length()
+        self.arrival = array('d', bytes(8 * capacity))
+        self.exit = array('b', bytes(capacity))
+        self.evu = array('b', bytes(capacity))
+        self.head = 0
+        self.size = 0
+        self.mask = capacity - 1
+
+    def __len__(self):
+        return self.size
+
+    def push(self, arrival: float, exit_index: int, evu_class: int):
+        """Adds a vehicle to the back of the queue."""
+        if self.size > self.mask:
+            self._grow()
+        i = (self.head + self.size) & self.mask
+        self.arrival[i] = arrival
+        self.exit[i] = exit_index
+        self.evu[i] = evu_class
+        self.size += 1
+
+    def pop(self) -> tuple:
+        """Removes the vehicle at the front and returns (arrival, exit index, EVU class)."""
+        i = self.head
+        self.head = (i + 1) & self.mask
+        self.size -= 1
+        return self.arrival[i], self.exit[i], self.evu[i]
+
+    def arrivals(self):
+        """Iterates over the arrival times of the queued vehicles, front first."""
+        for k in range(self.size):
+            yield self.arrival[(self.head + k) & self.mask]
+
+    def _grow(self):
+        """Doubles the capacity, unrolling the ring so the front is at index 0."""
+        capacity = self.mask + 1
+        order = [(self.head + k) & self.mask for k in range(self.size)]
+
+        self.arrival = array('d', [self.arrival[i] for i in order]) + array('d', bytes(8 * capacity))
+        self.exit = array('b', [self.exit[i] for i in order]) + array('b', bytes(capacity))
+        self.evu = array('b', [self.evu[i] for i in order]) + array('b', bytes(capacity))
+        self.head = 0
+        self.mask = 2 * capacity - 1
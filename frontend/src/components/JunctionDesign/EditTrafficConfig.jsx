@@ -263,7 +263,7 @@ const EditTrafficConfig = ({ configId, onNavigate }) => {
       console.log("Update result:", result);
       
       if (!response.ok || !result.success) {
-        throw new Error(result.error || result.errors || `Update failed with status: ${response.status}`);
+        throw new Error([].concat(result.error || `Update failed with status: ${response.status}`).join(' '));
       }
       
       console.log("Configuration successfully updated");
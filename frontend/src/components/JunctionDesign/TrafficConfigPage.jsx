@@ -166,7 +166,7 @@ const TrafficConfigPage = ({ onNavigate, previousPage, editFlowId = null }) => {
       console.log("Response:", data);
 
       if (!data.success) {
-        setErrors(Array.isArray(data.errors) ? data.errors : [data.error || 'Save failed']);
+        setErrors(Array.isArray(data.error) ? data.error : [data.error || 'Save failed']);
         setIsSubmitting(false);
         return;
       }
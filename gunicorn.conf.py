@@ -0,0 +1,40 @@
+"""
+Production server settings; start the app with `gunicorn` from the project root.
+
+The app is loaded and warmed up once in the master process and then forked,
+so workers share its memory copy-on-write. Send HUP for a graceful reload:
+new workers are forked with the current settings and old ones finish their
+requests first. As the app is preloaded, HUP doesn't pick up code changes;
+for those send USR2 to start a new master, then QUIT to the old one.
+"""
+import os
+import tempfile
+
+wsgi_app = "backend.app:app"
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# Simulations hold the GIL, so processes give the parallelism and threads cover waiting on the database
+workers = int(os.environ.get("WEB_WORKERS", 0)) or os.cpu_count() or 1
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Share the cores between the workers' replication process pools rather than giving each all of them
+os.environ.setdefault("SIMULATION_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+# Each worker writes its metrics here so /api/metrics reports the sum over all of them
+if "METRICS_DIR" not in os.environ:
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="junction-metrics-")
+
+# A configuration write in one worker clears the configuration caches of the others
+os.environ.setdefault("CONFIG_CACHE_GENERATION_FILE", os.path.join(os.environ["METRICS_DIR"], "config_cache.generation"))
+
+
+def when_ready(server):
+    from backend.serving import warming_up
+    preloaded = warming_up()
+    server.log.info("Warmed up with %d cached simulation results", preloaded)
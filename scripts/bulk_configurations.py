@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bulk configuration transfer script.
+Run this script to:
+1. Export every traffic flow and junction configuration to an NDJSON file
+2. Import traffic flow and junction configurations from an NDJSON file
+
+Usage:
+    python scripts/bulk_configurations.py export configurations.ndjson
+    python scripts/bulk_configurations.py import configurations.ndjson [--batch-size 500]
+
+Use "-" as the file to write to stdout or read from stdin.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to sys.path
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from backend.bulk_transfer import exporting_configurations, importing_configurations, IMPORT_BATCH_SIZE
+
+def export_configurations(path):
+    """Write every stored configuration to the NDJSON file."""
+    output = sys.stdout if path == "-" else open(path, "w")
+    count = 0
+    try:
+        for line in exporting_configurations():
+            output.write(line)
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Exported {count} configurations.", file=sys.stderr)
+    return True
+
+def import_configurations(path, batch_size):
+    """Import configurations from the NDJSON file, printing each failed record."""
+    source = sys.stdin if path == "-" else open(path, "r")
+    summary = {}
+    try:
+        for result in importing_configurations(source, batch_size=batch_size):
+            if result["type"] == "summary":
+                summary = result
+            else:
+                print(json.dumps(result), file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    print(f"Imported {summary.get('created', 0)} configurations, {summary.get('failed', 0)} failed.", file=sys.stderr)
+    return summary.get("failed", 0) == 0
+
+def main():
+    """Parse the command line and run the export or import."""
+    parser = argparse.ArgumentParser(description="Export or import traffic flow and junction configurations as NDJSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="write all configurations to a file")
+    export_parser.add_argument("file", help="NDJSON file to write, or - for stdout")
+
+    import_parser = subparsers.add_parser("import", help="load configurations from a file")
+    import_parser.add_argument("file", help="NDJSON file to read, or - for stdin")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="records saved per transaction")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        success = export_configurations(args.file)
+    else:
+        success = import_configurations(args.file, args.batch_size)
+
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
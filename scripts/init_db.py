@@ -2,8 +2,11 @@
 """
 Database initialization script.
 Run this script to:
-1. Create the database tables if they don't exist
+1. Apply any pending schema migrations (creating the tables on a new database)
 2. Migrate data from JSON to SQLite (if JSON file exists)
+
+Deployments that run it before starting the app can set
+RUN_MIGRATIONS_ON_STARTUP=0 so app processes never migrate.
 """
 
 import os
@@ -16,12 +19,14 @@ parent_dir = current_dir.parent
 sys.path.append(str(parent_dir))
 
 from backend.models.db_models import init_db
-from backend.storage import migrate_json_to_db
+from backend.migrations import run_migrations, importing_json_configurations
 
 def main():
     """Initialize the database and migrate data from JSON if needed."""
     print("Initializing database...")
     engine = init_db()
+    applied = run_migrations(engine)
+    print(f"Applied {len(applied)} pending migration(s).")
     
     # Migrate data from JSON if it exists
     print("Checking for JSON data to migrate...")
@@ -30,11 +35,15 @@ def main():
     if os.path.exists(json_file_path):
         print(f"Found JSON file: {json_file_path}")
         print("Migrating data from JSON to SQLite database...")
-        success = migrate_json_to_db()
+        try:
+            success = importing_json_configurations(engine)
+        except Exception as e:
+            print(f"Migration error: {e}")
+            success = False
         
         if success:
             print("Data migration successful!")
-            # Optionally backup and rename the JSON file to prevent duplicate imports
+            # Already imported names are skipped, but rename the file so it isn't read again
             backup_path = json_file_path + ".bak"
             try:
                 os.rename(json_file_path, backup_path)
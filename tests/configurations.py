@@ -0,0 +1,30 @@
+from backend.simulation import DIRECTIONS
+
+EXIT_NAMES = {"northbound": "exit_north", "southbound": "exit_south", "eastbound": "exit_east", "westbound": "exit_west"}
+
+
+def flow_data(incoming_flow) -> dict:
+    """Stored flows with every vehicle going straight on, from one flow for all directions or one per direction."""
+    if not isinstance(incoming_flow, dict):
+        incoming_flow = {direction: incoming_flow for direction in DIRECTIONS}
+    return {
+        direction: {"incoming_flow": flow, "exits": {EXIT_NAMES[direction]: flow}}
+        for direction, flow in incoming_flow.items()
+    }
+
+
+def junction_data(num_lanes: int = 1) -> dict:
+    """Stored junction settings with plain lanes and equal priorities."""
+    return {
+        direction: {
+            "num_lanes": num_lanes,
+            "enable_left_turn_lane": False,
+            "enable_bus_cycle_lane": False,
+            "bus_cycle_lane_type": "",
+            "pedestrian_crossing_enabled": False,
+            "pedestrian_crossing_duration": 0,
+            "pedestrian_crossing_requests_per_hour": 0,
+            "traffic_priority": 0
+        }
+        for direction in DIRECTIONS
+    }
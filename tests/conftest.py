@@ -0,0 +1,31 @@
+import os
+import shutil
+import tempfile
+
+# The engine reads DATABASE_URL when backend is first imported, so it is set before any test imports it
+_DATABASE_DIR = tempfile.mkdtemp(prefix="junction-sim-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DATABASE_DIR, 'test.db')}"
+
+import pytest
+
+from backend.app import app
+from backend.db_session import session_scope
+from backend.models.db_models import (
+    TrafficFlow, JunctionConfiguration, SimulationCacheEntry, SimulationRun, SimulationJob
+)
+from backend.result_cache import simulation_cache, config_cache
+
+
+@pytest.fixture
+def client():
+    """A test client for the app, over an emptied database and caches."""
+    with session_scope(shared=False) as session:
+        for model in (SimulationRun, SimulationCacheEntry, SimulationJob, JunctionConfiguration, TrafficFlow):
+            session.query(model).delete()
+    simulation_cache.clear()
+    config_cache.clear()
+    return app.test_client()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_DATABASE_DIR, ignore_errors=True)
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from configurations import flow_data, junction_data
+
+
+def _importing(client, records, **args) -> list:
+    """Posts NDJSON lines, given as strings or records, and returns the streamed results."""
+    body = "\n".join(record if isinstance(record, str) else json.dumps(record) for record in records) + "\n"
+    response = client.post("/api/configurations/import", data=body, query_string=args)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def _traffic_flow(name, **flows) -> dict:
+    return {"type": "traffic_flow", "name": name, "flows": {**flow_data(200), **flows}}
+
+
+def _junction(name, traffic_flow_name) -> dict:
+    return {"type": "junction", "name": name, "traffic_flow_config": traffic_flow_name, **junction_data(2)}
+
+
+def test_export_imports_again(client):
+    results = _importing(client, [_traffic_flow("Morning"), _junction("Crossroads", "Morning")])
+    assert results == [{"type": "summary", "created": 2, "failed": 0}]
+
+    exported = client.get("/api/configurations/export").data.decode().splitlines()
+    assert [json.loads(line)["type"] for line in exported] == ["traffic_flow", "junction"]
+
+    # Every name is now taken, so importing the export again only reports them
+    results = _importing(client, exported)
+    assert results[-1] == {"type": "summary", "created": 0, "failed": 2}
+
+
+@pytest.mark.parametrize("line", [
+    "{not json",
+    "[1, 2, 3]",
+    "null",
+    json.dumps({"type": "roundabout", "name": "Unknown"}),
+    json.dumps(_traffic_flow("Text flow", northbound={"incoming_flow": "200", "exits": {"exit_north": 200}})),
+    json.dumps(_traffic_flow("Text exits", northbound={"incoming_flow": 200, "exits": {"exit_north": "200"}})),
+    json.dumps(_traffic_flow("Listed exits", northbound={"incoming_flow": 200, "exits": [200]})),
+    json.dumps(_traffic_flow("Unbalanced", northbound={"incoming_flow": 200, "exits": {"exit_north": 100}})),
+    json.dumps(_traffic_flow("Bad profile", northbound={"incoming_flow": 200, "exits": {"exit_north": 200}, "profile": "rush"})),
+    json.dumps({"type": "traffic_flow", "name": "No directions", "flows": ["north"]}),
+    json.dumps({"type": "junction", "name": "No settings", "traffic_flow_config": "Morning"}),
+    json.dumps({**_junction("No flow", "Morning"), "traffic_flow_config": 7})
+])
+def test_malformed_record_fails_alone(client, line):
+    results = _importing(client, [_traffic_flow("Morning"), line, _junction("Crossroads", "Morning")])
+
+    assert len(results) == 2
+    error, summary = results
+    assert error["type"] == "error"
+    assert error["line"] == 2
+    assert error["errors"] and all(isinstance(message, str) for message in error["errors"])
+    assert summary == {"type": "summary", "created": 2, "failed": 1}
+
+
+def test_junction_of_unknown_flow_fails_in_its_batch(client):
+    results = _importing(client, [
+        _traffic_flow("Morning"),
+        _junction("Orphan", "Evening"),
+        _junction("Crossroads", "Morning")
+    ], batch_size=1)
+
+    assert [result["type"] for result in results] == ["error", "summary"]
+    assert results[0]["line"] == 2
+    assert results[0]["name"] == "Orphan"
+    assert results[1] == {"type": "summary", "created": 2, "failed": 1}
+
+
+def test_duplicate_names_within_an_import(client):
+    results = _importing(client, [_traffic_flow("Morning"), _traffic_flow("Morning")])
+    assert results[0]["line"] == 2
+    assert results[-1] == {"type": "summary", "created": 1, "failed": 1}
+
+
+def test_blank_lines_are_skipped(client):
+    results = _importing(client, ["", _traffic_flow("Morning"), "   "])
+    assert results == [{"type": "summary", "created": 1, "failed": 0}]
+
+
+def test_batch_size_is_bounded(client):
+    response = client.post("/api/configurations/import", data="", query_string={"batch_size": 0})
+    assert response.status_code == 400
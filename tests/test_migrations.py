@@ -0,0 +1,120 @@
+import json
+
+import pytest
+from sqlalchemy import inspect, text
+
+from backend import migrations
+from backend.models.db_models import Base, TrafficFlow, JunctionConfiguration, SchemaMigration, SessionFactory, init_db
+
+from configurations import flow_data, junction_data
+
+MIGRATION_NAMES = [name for name, _ in migrations.MIGRATIONS]
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """An engine on an empty database, run from a folder with no JSON configurations to import."""
+    monkeypatch.chdir(tmp_path)
+    engine = init_db(f"sqlite:///{tmp_path / 'migrated.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _schema(engine) -> dict:
+    """Each table's columns and indexes, for comparing databases."""
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted((index["name"], tuple(index["column_names"])) for index in inspector.get_indexes(table))
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def _recorded(engine) -> list:
+    session = SessionFactory(bind=engine)
+    try:
+        return sorted(name for (name,) in session.query(SchemaMigration.name).all())
+    finally:
+        session.close()
+
+
+def _failing(engine):
+    raise RuntimeError("Disk full")
+
+
+def _succeeding(engine):
+    pass
+
+
+def test_migrations_run_once(engine):
+    assert migrations.run_migrations(engine) == MIGRATION_NAMES
+    assert migrations.run_migrations(engine) == []
+    assert _recorded(engine) == sorted(MIGRATION_NAMES)
+
+
+def test_migrated_schema_matches_models(engine, tmp_path):
+    migrations.run_migrations(engine)
+    expected = init_db(f"sqlite:///{tmp_path / 'created.db'}")
+    Base.metadata.create_all(expected)
+
+    assert _schema(engine) == _schema(expected)
+    expected.dispose()
+
+
+def test_legacy_tables_are_upgraded_and_backfilled(engine):
+    # Tables as they were before the summary columns and worker tokens
+    migrations.creating_tables(engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO traffic_flows (id, name, flow_data) VALUES (1, 'Morning', :flows)"),
+                           {"flows": json.dumps(flow_data(200))})
+        connection.execute(text(
+            "INSERT INTO junction_configurations (id, name, traffic_flow_id, junction_data) VALUES (1, 'Crossroads', 1, :junction)"
+        ), {"junction": json.dumps(junction_data(2))})
+
+    assert migrations.run_migrations(engine) == MIGRATION_NAMES
+    session = SessionFactory(bind=engine)
+    try:
+        assert session.query(TrafficFlow.total_flow).scalar() == 800
+        assert session.query(JunctionConfiguration.total_lanes).scalar() == 8
+    finally:
+        session.close()
+
+
+def test_json_configurations_are_imported_once(engine, tmp_path):
+    (tmp_path / "backend" / "database").mkdir(parents=True)
+    (tmp_path / "backend" / "database" / "storing_configs.json").write_text(json.dumps({
+        "traffic_flow_configurations": {"Morning": {"northbound": {"exit_north": 200}}},
+        "junction_configurations": {"Crossroads": {"name": "Crossroads", "traffic_flow_config": "Morning", **junction_data(1)}}
+    }))
+
+    migrations.run_migrations(engine)
+    # Run again as if it were never recorded; stored names are skipped
+    assert migrations.importing_json_configurations(engine) is True
+
+    session = SessionFactory(bind=engine)
+    try:
+        assert session.query(TrafficFlow).count() == 1
+        assert session.query(JunctionConfiguration).count() == 1
+    finally:
+        session.close()
+
+
+def test_failed_migration_is_not_recorded_and_runs_again(engine, monkeypatch):
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [("9999_failing", _failing)])
+    with pytest.raises(RuntimeError):
+        migrations.run_migrations(engine)
+    assert _recorded(engine) == sorted(MIGRATION_NAMES)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:-1] + [("9999_failing", _succeeding)])
+    assert migrations.run_migrations(engine) == ["9999_failing"]
+
+
+def test_changed_migration_is_not_run_again(engine):
+    migrations.run_migrations(engine)
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE schema_migrations SET checksum = 'edited' WHERE name = :name"),
+                           {"name": MIGRATION_NAMES[0]})
+
+    assert migrations.run_migrations(engine) == []
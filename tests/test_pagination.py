@@ -0,0 +1,90 @@
+import pytest
+
+from backend.db_session import session_scope
+from backend.models.db_models import TrafficFlow, JunctionConfiguration
+
+from configurations import flow_data, junction_data
+
+# Repeated totals put ties on page boundaries, which the ID in the cursor has to break
+TOTAL_FLOWS = [400, 400, 400, 800, 800, 1200, 1600]
+
+
+@pytest.fixture
+def stored_flows(client):
+    """Stores one traffic flow per total in TOTAL_FLOWS, each with one junction of unknown efficiency."""
+    with session_scope(shared=False) as session:
+        for i, total in enumerate(TOTAL_FLOWS):
+            traffic_flow = TrafficFlow.from_dict({"name": f"flow{i}", "flows": flow_data(total // 4)})
+            session.add(traffic_flow)
+            session.flush()
+            session.add(JunctionConfiguration.from_dict(
+                {"name": f"junction{i}", **junction_data(1 + i % 3)}, traffic_flow.id
+            ))
+    return client
+
+
+def _paging(client, path, **args) -> tuple:
+    """Follows X-Next-Cursor from the first page; returns the pages' item IDs and the number of pages."""
+    ids = []
+    pages = 0
+    cursor = None
+    while True:
+        response = client.get(path, query_string={**args, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in response.get_json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids, pages
+        assert 'rel="next"' in response.headers["Link"]
+
+
+@pytest.mark.parametrize("sort", ["id", "-id", "name", "total", "-total", "northbound"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 6, 7, 8])
+def test_pages_cover_every_flow_once_in_order(stored_flows, sort, limit):
+    everything = [item["id"] for item in stored_flows.get("/api/traffic-flows", query_string={"sort": sort}).get_json()]
+    ids, pages = _paging(stored_flows, "/api/traffic-flows", sort=sort, limit=limit)
+
+    assert len(everything) == len(TOTAL_FLOWS)
+    assert ids == everything
+    assert pages == max(1, -(-len(TOTAL_FLOWS) // limit))
+
+
+@pytest.mark.parametrize("sort", ["lanes", "-lanes", "efficiency", "-efficiency"])
+def test_junction_pages_cover_every_junction_once(stored_flows, sort):
+    everything = [item["id"] for item in stored_flows.get("/api/junctions", query_string={"sort": sort}).get_json()]
+    ids, _ = _paging(stored_flows, "/api/junctions", sort=sort, limit=2)
+
+    assert sorted(everything) == sorted(ids)
+    assert ids == everything
+
+
+def test_last_full_page_has_no_cursor(stored_flows):
+    response = stored_flows.get("/api/traffic-flows", query_string={"limit": len(TOTAL_FLOWS)})
+    assert len(response.get_json()) == len(TOTAL_FLOWS)
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_filters_apply_on_every_page(stored_flows):
+    ids, pages = _paging(stored_flows, "/api/traffic-flows", sort="-total", min_total=800, limit=2)
+    assert len(ids) == 4
+    assert pages == 2
+
+
+@pytest.mark.parametrize("args", [
+    {"limit": 0},
+    {"limit": 201},
+    {"limit": "ten"},
+    {"cursor": "not-a-cursor"},
+    {"sort": "colour"}
+])
+def test_invalid_page_arguments_are_rejected(stored_flows, args):
+    response = stored_flows.get("/api/traffic-flows", query_string=args)
+    assert response.status_code == 400
+    assert isinstance(response.get_json()["error"], list)
+
+
+def test_cursor_only_applies_to_its_own_sort(stored_flows):
+    cursor = stored_flows.get("/api/traffic-flows", query_string={"sort": "total", "limit": 2}).headers["X-Next-Cursor"]
+    response = stored_flows.get("/api/traffic-flows", query_string={"sort": "-total", "cursor": cursor})
+    assert response.status_code == 400
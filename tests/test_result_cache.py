@@ -0,0 +1,84 @@
+import multiprocessing
+
+from backend.result_cache import ResultCache, config_hash
+
+from configurations import flow_data, junction_data
+
+
+def _invalidating(path, tag):
+    """Invalidates a tag from a cache in another process sharing the generation file."""
+    ResultCache(shared_generation_file=path).invalidate(tag)
+
+
+def _running_in_another_process(target, *args):
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    process.join(60)
+    assert process.exitcode == 0
+
+
+def test_invalidation_drops_only_tagged_entries():
+    cache = ResultCache()
+    cache.put("north", 1, tags=("flow:1", "junction:1"))
+    cache.put("south", 2, tags=("flow:2",))
+
+    assert cache.invalidate("flow:1") == 1
+    assert cache.get("north") is None
+    assert cache.get("south") == 2
+    assert cache.invalidate("flow:1") == 0
+
+
+def test_put_from_before_an_invalidation_is_discarded():
+    cache = ResultCache()
+    generation = cache.generation
+    # A write lands while the value is being read from the database
+    cache.invalidate("flow:1")
+    cache.put("north", "stale", tags=("flow:1",), generation=generation)
+    assert cache.get("north") is None
+
+    cache.put("north", "fresh", tags=("flow:1",), generation=cache.generation)
+    assert cache.get("north") == "fresh"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_invalidation_in_another_process_clears_this_one(tmp_path):
+    path = str(tmp_path / "generation")
+    cache = ResultCache(shared_generation_file=path)
+    cache.put("north", 1, tags=("flow:1",))
+    assert cache.get("north") == 1
+    generation = cache.generation
+
+    _running_in_another_process(_invalidating, path, "flow:1")
+
+    assert cache.get("north") is None
+    assert cache.generation > generation
+    # A read begun before the other process's write can't be cached afterwards
+    cache.put("north", "stale", generation=generation)
+    assert cache.get("north") is None
+
+
+def test_every_invalidation_in_another_process_is_seen(tmp_path):
+    path = str(tmp_path / "generation")
+    cache = ResultCache(shared_generation_file=path)
+    for round_number in range(3):
+        cache.put("north", round_number)
+        assert cache.get("north") == round_number
+        _running_in_another_process(_invalidating, path, "flow:1")
+        assert cache.get("north") is None
+
+
+def test_config_hash_ignores_names_and_metrics():
+    junction = junction_data(2)
+    named = {**junction, "name": "Crossroads", "metrics": {"efficiency_score": 50}}
+    assert config_hash(junction, flow_data(200)) == config_hash(named, flow_data(200))
+    assert config_hash(junction, flow_data(200)) != config_hash(junction, flow_data(300))
+    assert config_hash(junction, flow_data(200), seed=1) != config_hash(junction, flow_data(200), seed=2)
@@ -0,0 +1,48 @@
+import pytest
+
+from backend.estimator import estimate
+from backend.simulation import DIRECTIONS, simulate
+
+from configurations import flow_data, junction_data
+
+SEEDS = range(10)
+
+
+def _mean_simulated(junction, flows) -> dict:
+    """Average wait per direction and efficiency over several seeded runs."""
+    runs = [simulate(junction, flows, seed=seed).to_dict() for seed in SEEDS]
+    waits = {
+        direction: sum(run["average_wait_times"][direction] for run in runs) / len(runs)
+        for direction in DIRECTIONS
+    }
+    efficiency = sum(run["efficiency_score"] for run in runs) / len(runs)
+    return waits, efficiency
+
+
+@pytest.mark.parametrize("num_lanes, incoming_flow", [(1, 200), (2, 400), (2, 600), (3, 900)])
+def test_engine_matches_estimator_below_saturation(num_lanes, incoming_flow):
+    junction, flows = junction_data(num_lanes), flow_data(incoming_flow)
+    estimated = estimate(junction, flows)
+    assert max(estimated["degree_of_saturation"].values()) < 0.9
+
+    waits, efficiency = _mean_simulated(junction, flows)
+    for direction in DIRECTIONS:
+        assert waits[direction] == pytest.approx(estimated["average_wait_times"][direction], rel=0.2)
+    assert efficiency == pytest.approx(estimated["efficiency_score"], abs=3)
+
+
+def test_engine_and_estimator_agree_on_oversaturation():
+    junction = junction_data(1)
+    under, _ = _mean_simulated(junction, flow_data(300))
+    over, _ = _mean_simulated(junction, flow_data(500))
+    estimated = estimate(junction, flow_data(500))
+
+    assert min(estimated["degree_of_saturation"].values()) > 1
+    for direction in DIRECTIONS:
+        assert over[direction] > 5 * under[direction]
+        assert over[direction] == pytest.approx(estimated["average_wait_times"][direction], rel=0.25)
+
+
+def test_seeded_runs_are_reproducible():
+    junction, flows = junction_data(2), flow_data(500)
+    assert simulate(junction, flows, seed=7).to_dict() == simulate(junction, flows, seed=7).to_dict()